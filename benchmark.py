@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+# Mode sans fenêtre : doit être défini avant l'initialisation de Pygame
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import map as m
+import game as g
+
+# Dossier contenant les cartes Tiled à mesurer par défaut
+TMX_DIRECTORY = "Assets/assets tiled"
+
+# Parcours scripté : une direction par tuile, rejoué en boucle
+WALK_PATH = ["right"] * 4 + ["down"] * 4 + ["left"] * 4 + ["up"] * 4
+
+DIRECTIONS = {
+    "left": (-1, 0),
+    "right": (1, 0),
+    "up": (0, -1),
+    "down": (0, 1),
+}
+
+
+def percentile(sorted_values, ratio):
+    """
+    Retourne le percentile (ratio entre 0 et 1) d'une liste déjà triée.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))]
+
+
+def hit_rate(cache):
+    """
+    Retourne le taux de succès d'un cache exposant hits/misses.
+    """
+    total = cache.hits + cache.misses
+    return cache.hits / total if total else None
+
+
+def benchmark_map(game, map_file, frames):
+    """
+    Charge une carte, rejoue le parcours scripté pendant frames frames (update + render)
+    et retourne les mesures sous forme de dictionnaire.
+    """
+    start = time.perf_counter()
+    cold_map = m.Map(map_file, game.maps.collidable_json)
+    map_load_ms = (time.perf_counter() - start) * 1000
+
+    game.load_map(map_file, (0, 0))
+    spawn = game.find_valid_spawn(game.map.map_width // 2, game.map.map_height // 2)
+    game.load_map(map_file, spawn)
+
+    tile_cache = game.map.tile_cache
+    chunk_cache = game.map.chunk_cache
+    tile_cache.level_hits = tile_cache.level_misses = 0
+    chunk_cache.hits = chunk_cache.misses = 0
+
+    frame_times = []
+    blits = 0
+    teleports = 0
+    step = 0
+    for _ in range(frames):
+        pygame.event.pump()
+        direction_x, direction_y = 0, 0
+        if not game.player.is_moving:
+            direction = WALK_PATH[step % len(WALK_PATH)]
+            step += 1
+            direction_x, direction_y = DIRECTIONS[direction]
+
+        current_map = game.map
+        start = time.perf_counter()
+        game.update(direction_x, direction_y)
+        game.render()
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+        if game.map is not current_map:
+            teleports += 1
+        blits += game.blit_count
+
+    frame_times.sort()
+    return {
+        "map_load_ms": round(map_load_ms, 3),
+        "bundle": cold_map.tmx_data is None,
+        "frame_ms": {
+            "mean": round(sum(frame_times) / len(frame_times), 3),
+            "p95": round(percentile(frame_times, 0.95), 3),
+            "p99": round(percentile(frame_times, 0.99), 3),
+            "max": round(frame_times[-1], 3),
+        },
+        "blits_per_frame": round(blits / frames, 2),
+        "tile_levels_built": tile_cache.level_misses,
+        "chunk_cache_hit_rate": hit_rate(chunk_cache),
+        "teleports": teleports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure les performances de la boucle de jeu sans fenêtre.")
+    parser.add_argument("tmx_files", nargs="*", help="Cartes à mesurer (par défaut toutes celles du dossier des cartes)")
+    parser.add_argument("--frames", type=int, default=600, help="Nombre de frames par carte")
+    parser.add_argument("--lowres", action="store_true", help="Mesure le rendu basse résolution agrandi une seule fois par frame")
+    parser.add_argument("--npcs", type=int, default=0, help="Nombre de PNJ allant de porte en porte sur chaque carte")
+    parser.add_argument("--output", help="Fichier JSON de sortie (par défaut la sortie standard)")
+    args = parser.parse_args()
+
+    game = g.Game(lowres=args.lowres, npc_count=args.npcs)
+    results = {"frames": args.frames, "lowres": args.lowres, "npcs": args.npcs, "maps": {}}
+    for map_file in args.tmx_files or sorted(glob.glob(os.path.join(TMX_DIRECTORY, "*.tmx"))):
+        results["maps"][map_file] = benchmark_map(game, map_file, args.frames)
+    pygame.quit()
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
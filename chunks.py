@@ -0,0 +1,155 @@
+import pygame
+import math
+from collections import OrderedDict
+
+# Taille d'un chunk en tuiles (16x16 tuiles par surface pré-calculée)
+CHUNK_SIZE = 16
+
+# Budget mémoire par défaut pour les surfaces de chunks (en octets)
+CHUNK_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+class ChunkCache:
+    def __init__(self, game_map, chunk_size=CHUNK_SIZE, budget_bytes=CHUNK_BUDGET_BYTES):
+        """
+        Initialise le cache de chunks d'une carte.
+        Chaque chunk aplatit les calques statiques d'une zone de chunk_size x chunk_size tuiles
+        dans une seule surface déjà mise à l'échelle. Les chunks sont évincés (LRU)
+        dès que la mémoire occupée dépasse budget_bytes.
+        """
+        self.map = game_map
+        self.chunk_size = chunk_size
+        self.budget_bytes = budget_bytes
+        self.chunks = OrderedDict()  # (cx, cy, zoom) -> (surface ou None, taille en octets)
+        self.used_bytes = 0
+        self.frame = 0
+        self.last_used = {}  # (cx, cy, zoom) -> numéro de la dernière frame d'utilisation
+        self.hits = 0
+        self.misses = 0
+        self.blit_count = 0  # Nombre de blits de la dernière frame
+
+    def clear(self):
+        """
+        Vide entièrement le cache.
+        """
+        self.chunks.clear()
+        self.last_used.clear()
+        self.used_bytes = 0
+
+    def build_chunk(self, cx, cy, zoom, screen, level=None):
+        """
+        Construit la surface d'un chunk en y dessinant les tuiles visibles (non masquées par une tuile
+        opaque, voir Map.compute_occlusion) de tous les calques statiques, avec un seul appel à
+        Surface.blits par calque (sources prises dans les atlas du niveau de zoom).
+        level permet de fournir le niveau déjà construit ((atlas alpha, atlas opaque), {gid: (atlas source, rectangle)}) ;
+        sinon il est demandé à la carte. Retourne None si le chunk ne contient aucune tuile.
+        """
+        size = self.chunk_size
+        scaled_tile_width = self.map.tile_width * zoom
+        scaled_tile_height = self.map.tile_height * zoom
+        first_x = cx * size
+        first_y = cy * size
+        last_x = min(first_x + size, self.map.map_width)
+        last_y = min(first_y + size, self.map.map_height)
+        _, tiles = level if level is not None else self.map.get_tile_atlas(zoom)
+
+        surface = None
+        for layer in self.map.compute_occlusion()[0]:
+            # Calques sans tuile dans ce chunk : ignorés sans parcourir leur grille
+            occupancy = layer.occupancy
+            if occupancy.chunk_size == size and not occupancy.chunk_occupied(cx, cy):
+                continue
+            window = occupancy.clip(first_x, first_y, last_x, last_y)
+            if window is None:
+                continue
+            sequence = []
+            for y in range(window[1], window[3]):
+                row = layer.data[y]
+                draw_y = (y - first_y) * scaled_tile_height
+                for x in range(window[0], window[2]):
+                    gid = row[x]
+                    if gid != 0:
+                        tile = tiles.get(gid)
+                        if tile:
+                            sequence.append((tile[0], ((x - first_x) * scaled_tile_width, draw_y), tile[1]))
+            if sequence:
+                if surface is None:
+                    # Fond noir opaque : identique au screen.fill fait avant le rendu de la carte
+                    surface = pygame.Surface(
+                        (math.ceil(size * scaled_tile_width), math.ceil(size * scaled_tile_height)),
+                        0,
+                        screen
+                    )
+                surface.blits(sequence, doreturn=False)
+        return surface
+
+    def get_chunk(self, cx, cy, zoom, screen):
+        """
+        Récupère la surface d'un chunk en la construisant si nécessaire.
+        """
+        key = (cx, cy, zoom)
+        self.last_used[key] = self.frame
+        if key in self.chunks:
+            self.hits += 1
+            self.chunks.move_to_end(key)
+            return self.chunks[key][0]
+
+        self.misses += 1
+        surface = self.build_chunk(cx, cy, zoom, screen)
+        self.store(key, surface)
+        return surface
+
+    def store(self, key, surface):
+        """
+        Ajoute au cache la surface d'un chunk (éventuellement pré-rendue hors de la boucle de rendu).
+        """
+        if key in self.chunks:
+            self.used_bytes -= self.chunks.pop(key)[1]
+        nbytes = surface.get_bytesize() * surface.get_width() * surface.get_height() if surface else 0
+        self.chunks[key] = (surface, nbytes)
+        self.used_bytes += nbytes
+        self.evict()
+
+    def bake(self, zoom, level, screen, first_x, first_y, last_x, last_y):
+        """
+        Pré-rend, avec un atlas déjà construit (voir TileCache.build_level), les chunks qui recoupent une fenêtre de tuiles.
+        Ne touche pas au cache : retourne {(cx, cy, zoom): surface}, à transmettre ensuite à store().
+        """
+        baked = {}
+        size = self.chunk_size
+        for cy in range(first_y // size, (max(last_y, first_y + 1) - 1) // size + 1):
+            for cx in range(first_x // size, (max(last_x, first_x + 1) - 1) // size + 1):
+                baked[(cx, cy, zoom)] = self.build_chunk(cx, cy, zoom, screen, level)
+        return baked
+
+    def evict(self):
+        """
+        Évince les chunks les moins récemment utilisés tant que le budget mémoire est dépassé.
+        Les chunks utilisés pendant la frame courante ne sont jamais évincés.
+        """
+        while self.used_bytes > self.budget_bytes and self.chunks:
+            key = next(iter(self.chunks))
+            if self.last_used.get(key) == self.frame:
+                break
+            _, nbytes = self.chunks.pop(key)
+            self.last_used.pop(key, None)
+            self.used_bytes -= nbytes
+
+    def render(self, screen, camera_x, camera_y, zoom, first_x, first_y, last_x, last_y):
+        """
+        Dessine les chunks qui recoupent la fenêtre de tuiles visibles.
+        """
+        self.frame += 1
+        self.blit_count = 0
+        if last_x <= first_x or last_y <= first_y:
+            return
+
+        size = self.chunk_size
+        chunk_width = size * self.map.tile_width * zoom
+        chunk_height = size * self.map.tile_height * zoom
+        for cy in range(first_y // size, (last_y - 1) // size + 1):
+            for cx in range(first_x // size, (last_x - 1) // size + 1):
+                surface = self.get_chunk(cx, cy, zoom, screen)
+                if surface:
+                    screen.blit(surface, (cx * chunk_width - camera_x, cy * chunk_height - camera_y))
+                    self.blit_count += 1
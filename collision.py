@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class CollisionGrid:
+    def __init__(self, width, height):
+        """
+        Initialise une grille de collision compacte : un octet par tuile (0 = libre, 1 = bloquante),
+        stockée ligne par ligne dans un bytearray de width x height.
+        """
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Construit une grille à partir d'un masque NumPy booléen de forme (hauteur, largeur).
+        """
+        height, width = mask.shape
+        grid = cls(width, height)
+        grid.cells[:] = mask.astype(np.uint8).tobytes()
+        return grid
+
+    @classmethod
+    def from_bitmap(cls, width, height, bits):
+        """
+        Reconstruit une grille à partir de sa forme compacte (1 bit par tuile, voir to_bitmap).
+        """
+        grid = cls(width, height)
+        unpacked = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=width * height, bitorder="little")
+        grid.cells[:] = unpacked.tobytes()
+        return grid
+
+    def to_bitmap(self):
+        """
+        Retourne la grille sous forme compacte : 1 bit par tuile, bit de poids faible en premier.
+        """
+        return np.packbits(np.frombuffer(self.cells, dtype=np.uint8) != 0, bitorder="little").tobytes()
+
+    def is_blocked(self, x, y):
+        """
+        Indique si la tuile (x, y) est bloquante. Les tuiles hors de la carte sont considérées bloquantes.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x] != 0
+        return True
+
+    def count(self):
+        """
+        Retourne le nombre de tuiles bloquantes.
+        """
+        return self.cells.count(1)
+
+    def blocked_cells(self):
+        """
+        Itère sur les coordonnées (x, y) des tuiles bloquantes.
+        """
+        index = self.cells.find(1)
+        while index != -1:
+            yield index % self.width, index // self.width
+            index = self.cells.find(1, index + 1)
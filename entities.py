@@ -0,0 +1,285 @@
+import numpy as np
+import pygame
+
+# Directions des sprites, dans l'ordre de leur code dans EntityStore.direction
+DIRECTIONS = ("down", "up", "left", "right")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+# Déplacement (en cases) associé à chaque code de direction
+DIRECTION_STEPS_X = np.array([0, 0, -1, 1], dtype=np.int64)
+DIRECTION_STEPS_Y = np.array([1, -1, 0, 0], dtype=np.int64)
+
+# Capacité initiale du stockage (doublée à chaque dépassement)
+ENTITY_CAPACITY = 64
+
+# Champs des entités : un tableau NumPy contigu par champ (structure de tableaux)
+ENTITY_FIELDS = (
+    ("position_x", np.float64),
+    ("position_y", np.float64),
+    ("previous_x", np.float64),  # Position au tick précédent, pour l'interpolation du rendu
+    ("previous_y", np.float64),
+    ("move_start_x", np.float64),
+    ("move_start_y", np.float64),
+    ("move_target_x", np.float64),
+    ("move_target_y", np.float64),
+    ("move_elapsed", np.float64),  # Temps de simulation écoulé depuis le début du déplacement (s)
+    ("move_duration", np.float64),
+    ("anim_speed", np.float64),
+    ("is_moving", np.bool_),
+    ("direction", np.uint8),  # Code dans DIRECTIONS
+    ("frame", np.uint8),  # Cadre d'animation courant
+    ("sprite", np.uint16),  # Jeu de sprites (voir add_sprite)
+    ("alive", np.bool_),
+)
+
+
+def build_frame_atlas(animations, tile_width, tile_height, zoom, sprite_scale):
+    """
+    Pré-calcule tous les cadres d'animation mis à l'échelle pour un zoom et une échelle de sprite.
+    Retourne un dictionnaire (direction, cadre, zoom, sprite_scale) -> surface.
+    """
+    scaled_width = int(tile_width * zoom * sprite_scale)
+    scaled_height = int(tile_height * zoom * sprite_scale)
+    atlas = {}
+    for direction, frames in animations.items():
+        for frame_index, frame in enumerate(frames):
+            atlas[(direction, frame_index, zoom, sprite_scale)] = pygame.transform.scale(
+                frame, (scaled_width, scaled_height)
+            )
+    return atlas
+
+
+class EntityStore:
+    def __init__(self, tile_width, tile_height, zoom=1.0, capacity=ENTITY_CAPACITY):
+        """
+        Initialise le stockage des entités mobiles (joueur, PNJ, bestioles) en structure de tableaux :
+        chaque champ d'ENTITY_FIELDS est un tableau NumPy indexé par identifiant d'entité, ce qui permet
+        d'avancer tous les déplacements d'un tick en une seule opération vectorisée (update).
+        Les cadres mis à l'échelle sont partagés par jeu de sprites et reconstruits seulement au changement de zoom.
+        """
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.zoom = zoom
+        self.capacity = 0
+        self.count = 0  # Identifiants attribués (vivants ou libérés)
+        self.free_ids = []
+        for name, dtype in ENTITY_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.grow(capacity)
+
+        # Jeux de sprites : animations {direction: [cadres]} et échelle de chacun
+        self.sprites = []
+        self.frames = []  # Cadres mis à l'échelle de tous les jeux, à plat
+        self.frame_base = np.zeros((0, len(DIRECTIONS)), dtype=np.int64)  # Indice du premier cadre dans frames
+        self.frame_count = np.zeros((0, len(DIRECTIONS)), dtype=np.int64)
+        self.frame_size = np.zeros((0, 2), dtype=np.float64)  # Taille à l'écran des cadres de chaque jeu
+
+    def grow(self, capacity):
+        """
+        Agrandit les tableaux à capacity entités en conservant leur contenu.
+        """
+        for name, dtype in ENTITY_FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add_sprite(self, animations, sprite_scale):
+        """
+        Enregistre un jeu de sprites ({direction: [cadres]}) partagé par toutes les entités qui l'utilisent.
+        Retourne son identifiant.
+        """
+        self.sprites.append((animations, sprite_scale))
+        self.build_frames()
+        return len(self.sprites) - 1
+
+    def build_frames(self):
+        """
+        Met à l'échelle les cadres de tous les jeux de sprites pour le zoom et la taille de tuile courants.
+        """
+        frames = []
+        frame_base = np.zeros((len(self.sprites), len(DIRECTIONS)), dtype=np.int64)
+        frame_count = np.zeros((len(self.sprites), len(DIRECTIONS)), dtype=np.int64)
+        frame_size = np.zeros((len(self.sprites), 2), dtype=np.float64)
+        for sprite, (animations, sprite_scale) in enumerate(self.sprites):
+            atlas = build_frame_atlas(animations, self.tile_width, self.tile_height, self.zoom, sprite_scale)
+            frame_size[sprite] = (int(self.tile_width * self.zoom * sprite_scale),
+                                  int(self.tile_height * self.zoom * sprite_scale))
+            for code, direction in enumerate(DIRECTIONS):
+                count = len(animations.get(direction, ()))
+                frame_base[sprite, code] = len(frames)
+                frame_count[sprite, code] = count
+                frames.extend(atlas[(direction, index, self.zoom, sprite_scale)] for index in range(count))
+        self.frames = frames
+        self.frame_base = frame_base
+        self.frame_count = frame_count
+        self.frame_size = frame_size
+
+    def set_zoom(self, zoom):
+        """
+        Met à jour le zoom et reconstruit les cadres mis à l'échelle uniquement si le zoom change.
+        """
+        if zoom != self.zoom:
+            self.zoom = zoom
+            self.build_frames()
+
+    def set_tile_size(self, tile_width, tile_height):
+        """
+        Met à jour la taille des tuiles de la carte (reconstruit les cadres si elle change).
+        """
+        if (tile_width, tile_height) != (self.tile_width, self.tile_height):
+            self.tile_width = tile_width
+            self.tile_height = tile_height
+            self.build_frames()
+
+    def add(self, x, y, sprite=0, direction="down", move_duration=0.1, anim_speed=0.3):
+        """
+        Ajoute une entité immobile en (x, y) et retourne son identifiant.
+        """
+        if self.free_ids:
+            entity = self.free_ids.pop()
+        else:
+            if self.count == self.capacity:
+                self.grow(self.capacity * 2)
+            entity = self.count
+            self.count += 1
+        for name, _ in ENTITY_FIELDS:
+            getattr(self, name)[entity] = 0
+        self.sprite[entity] = sprite
+        self.direction[entity] = DIRECTION_CODES[direction]
+        self.move_duration[entity] = move_duration
+        self.anim_speed[entity] = anim_speed
+        self.alive[entity] = True
+        self.reset_position(entity, x, y)
+        return entity
+
+    def add_many(self, xs, ys, sprite=0, move_duration=0.1, anim_speed=0.3):
+        """
+        Ajoute d'un coup une entité immobile en chaque position (xs[i], ys[i]). Retourne leurs identifiants.
+        """
+        return np.array([self.add(x, y, sprite, "down", move_duration, anim_speed)
+                         for x, y in zip(np.asarray(xs).tolist(), np.asarray(ys).tolist())], dtype=np.int64)
+
+    def remove(self, entity):
+        """
+        Supprime une entité ; son identifiant pourra être réutilisé.
+        """
+        if self.alive[entity]:
+            self.alive[entity] = False
+            self.is_moving[entity] = False
+            self.free_ids.append(entity)
+
+    def get_alive(self):
+        """
+        Retourne les identifiants des entités vivantes.
+        """
+        return np.flatnonzero(self.alive[:self.count])
+
+    def reset_position(self, entity, x, y):
+        """
+        Place une entité directement en (x, y), en annulant tout déplacement en cours.
+        """
+        self.position_x[entity] = self.previous_x[entity] = self.move_start_x[entity] = self.move_target_x[entity] = x
+        self.position_y[entity] = self.previous_y[entity] = self.move_start_y[entity] = self.move_target_y[entity] = y
+        self.is_moving[entity] = False
+        self.frame[entity] = 0
+
+    def start_move(self, entity, direction):
+        """
+        Démarre le déplacement d'une case d'une entité immobile dans une direction donnée.
+        """
+        if not self.is_moving[entity]:
+            self.start_moves(np.array([entity]), np.array([DIRECTION_CODES[direction]]))
+
+    def start_moves(self, entities, codes):
+        """
+        Démarre d'un coup le déplacement d'une case des entités données (supposées immobiles),
+        chacune dans la direction de code codes[i].
+        """
+        self.direction[entities] = codes
+        self.is_moving[entities] = True
+        self.move_elapsed[entities] = 0.0
+        self.frame[entities] = 0
+        self.move_start_x[entities] = self.position_x[entities]
+        self.move_start_y[entities] = self.position_y[entities]
+        self.move_target_x[entities] = self.position_x[entities] + DIRECTION_STEPS_X[codes]
+        self.move_target_y[entities] = self.position_y[entities] + DIRECTION_STEPS_Y[codes]
+
+    def update(self, dt):
+        """
+        Avance de dt secondes (pas de temps fixe) le déplacement et l'animation de toutes les entités,
+        en une seule passe vectorisée.
+        """
+        count = self.count
+        self.previous_x[:count] = self.position_x[:count]
+        self.previous_y[:count] = self.position_y[:count]
+        moving = np.flatnonzero(self.is_moving[:count])
+        if moving.size == 0:
+            return
+
+        elapsed = self.move_elapsed[moving] + dt
+        self.move_elapsed[moving] = elapsed
+        duration = self.move_duration[moving]
+        done = elapsed >= duration
+        ratio = elapsed / duration
+        start_x = self.move_start_x[moving]
+        start_y = self.move_start_y[moving]
+        target_x = self.move_target_x[moving]
+        target_y = self.move_target_y[moving]
+        self.position_x[moving] = np.where(done, target_x, start_x + ratio * (target_x - start_x))
+        self.position_y[moving] = np.where(done, target_y, start_y + ratio * (target_y - start_y))
+        self.is_moving[moving[done]] = False
+
+        # Cadre d'animation : progression du déplacement, le premier cadre à l'arrêt
+        frame_count = self.frame_count[self.sprite[moving], self.direction[moving]]
+        frames = np.minimum((ratio * self.anim_speed[moving] * frame_count).astype(np.int64), frame_count - 1)
+        self.frame[moving] = np.where(done, 0, frames)
+
+    def get_frame(self, entity):
+        """
+        Retourne le cadre courant (déjà mis à l'échelle) d'une entité.
+        """
+        return self.frames[self.frame_base[self.sprite[entity], self.direction[entity]] + self.frame[entity]]
+
+    def render(self, screen, camera_x, camera_y, alpha=1.0, exclude=()):
+        """
+        Dessine, avec un seul Surface.blits, toutes les entités vivantes visibles dans la zone de découpe
+        de screen, à leur position interpolée et de haut en bas (les plus basses par-dessus).
+        Les entités de exclude (ex. le joueur, dessiné à part) sont ignorées. Retourne le nombre de blits.
+        """
+        count = self.count
+        mask = self.alive[:count].copy()
+        mask[list(exclude)] = False
+        entities = np.flatnonzero(mask)
+        if entities.size == 0:
+            return 0
+
+        position_x = self.position_x[entities]
+        position_y = self.position_y[entities]
+        if alpha < 1.0:
+            position_x = self.previous_x[entities] + alpha * (position_x - self.previous_x[entities])
+            position_y = self.previous_y[entities] + alpha * (position_y - self.previous_y[entities])
+
+        sprites = self.sprite[entities]
+        width = self.frame_size[sprites, 0]
+        height = self.frame_size[sprites, 1]
+        # Sprite centré horizontalement sur sa case, comme pour le joueur
+        draw_x = position_x * self.tile_width * self.zoom - camera_x - (width - self.tile_width * self.zoom) / 2
+        draw_y = position_y * self.tile_height * self.zoom - camera_y
+
+        clip = screen.get_clip()
+        visible = ((draw_x < clip.right) & (draw_x + width > clip.left)
+                   & (draw_y < clip.bottom) & (draw_y + height > clip.top))
+        if not visible.any():
+            return 0
+        order = np.flatnonzero(visible)
+        order = order[np.argsort(draw_y[order], kind="stable")]
+
+        entities = entities[order]
+        codes = self.frame_base[sprites[order], self.direction[entities]] + self.frame[entities]
+        frames = self.frames
+        screen.blits(
+            [(frames[code], (x, y)) for code, x, y in zip(codes.tolist(), draw_x[order].tolist(), draw_y[order].tolist())],
+            doreturn=False
+        )
+        return int(entities.size)
@@ -1,34 +1,76 @@
 import pygame
 import sys
-import map as m
+import math
+import time
+import numpy as np
+import map_registry as mr
 import player as p
+import entities as en
 import teleport as t
+import tile_cache as tc
+import scroll_buffer as sb
+import profiler as pf
+import logger as lg
+
+log = lg.get_logger("game")
+
+# Fréquence fixe de la simulation (ticks par seconde) et durée d'un tick
+TICK_RATE = 60
+TICK_DURATION = 1.0 / TICK_RATE
+
+# Temps maximal rattrapé en une frame, pour éviter la spirale de rattrapage après un gel
+MAX_FRAME_TIME = 0.25
+
+# Durée (en secondes) de chaque fondu au noir lors d'une téléportation
+FADE_DURATION = 0.25
+
+# Zoom de composition du rendu basse résolution : tuiles à leur taille d'origine
+LOWRES_MAP_ZOOM = 1.0
+
+# Direction du joueur pour chaque pas d'un chemin (déplacement au clic)
+STEP_DIRECTIONS = {(-1, 0): "left", (1, 0): "right", (0, -1): "up", (0, 1): "down"}
+DIRECTION_STEPS = {direction: step for step, direction in STEP_DIRECTIONS.items()}
+
+# PNJ : probabilité, à chaque tick, qu'un PNJ à l'arrêt reparte, et durée d'un pas (en secondes)
+NPC_MOVE_CHANCE = 0.02
+NPC_MOVE_DURATION = 0.25
 
 class Game:
-    def __init__(self, screen_width=1280, screen_height=720):
+    def __init__(self, screen_width=1280, screen_height=720, max_fps=60, lowres=False, npc_count=0):
         """
         Initialise le jeu, y compris Pygame, la carte, le joueur, et les joysticks.
+        max_fps limite la fréquence de rendu (0 = rendu non plafonné) ; la simulation
+        tourne toujours à TICK_RATE ticks par seconde.
+        lowres=True active le rendu basse résolution (voir render_lowres), basculable avec la touche L.
+        npc_count PNJ errent sur chaque carte chargée (voir populate_npcs).
         """
         pygame.init()
         self.screen = pygame.display.set_mode((screen_width, screen_height))
         pygame.display.set_caption("Les échos de Xerath")
         self.clock = pygame.time.Clock()
+        self.max_fps = max_fps
+
+        # Registre des cartes chargées (cache LRU + préchargement en arrière-plan)
+        self.maps = mr.MapRegistry("collidable_layers.json")
 
         # Charger la carte initiale
         self.current_map_file = "Assets/assets tiled/mapv2.tmx"
-        self.map = m.Map(self.current_map_file, "collidable_layers.json")
+        self.map = self.maps.get(self.current_map_file)
 
         # Charger les zones de téléportation
-        self.teleporter = t.Teleporter("teleport-zones.json")
+        self.teleporter = t.Teleporter("teleport-zones_maps.json", self.maps)
 
 
         # Déterminer un spawn valide
         spawn_x, spawn_y = self.find_valid_spawn(81, 82)
-        print(f"[DEBUG] Spawn validé : ({spawn_x},{spawn_y})")
+        log.debug("Spawn validé : (%s,%s)", spawn_x, spawn_y)
 
         # Charger les animations du joueur
         self.animations = self.load_animations()
 
+        # Entités mobiles (joueur et PNJ) : état en tableaux NumPy, cadres mis à l'échelle partagés
+        self.entities = en.EntityStore(self.map.tile_width, self.map.tile_height, zoom=4.0)
+
         # Initialiser le joueur
         self.player = p.Player(
             animations=self.animations,
@@ -37,9 +79,24 @@ class Game:
             tile_width=self.map.tile_width,
             tile_height=self.map.tile_height,
             zoom=4.0,
-            sprite_scale=2
+            sprite_scale=2,
+            store=self.entities
         )
 
+        # PNJ : mêmes sprites que le joueur, placés au hasard dans la zone accessible de la carte,
+        # qui vont de cible en cible (portes, points d'arrivée) en suivant les champs de distance
+        self.npc_count = npc_count
+        self.npcs = np.zeros(0, dtype=np.int64)
+        self.npc_goals = np.zeros(0, dtype=np.int64)  # Indice dans npc_targets de la cible de chaque PNJ
+        self.npc_targets = []
+        self.npc_fields = None  # Champs de distance des cibles, une ligne par cible (voir get_npc_steps)
+        self.npc_fields_built = None
+        self.npc_random = np.random.default_rng()
+        self.populate_npcs()
+
+        # Précharger les cartes de destination des téléporteurs
+        self.teleporter.preload_destinations(self.player, self.current_map_file)
+
         # Paramètres de zoom
         self.zoom = 4.0
         self.sprite_scale = 2
@@ -53,9 +110,36 @@ class Game:
         # Pour répéter les KEYDOWN si on maintient la flèche
         pygame.key.set_repeat(200, 80)
 
+        # Rendu par rectangles modifiés : état du dernier rendu
+        self.last_view = None  # (carte, caméra, zoom) du dernier rendu complet ; None force un rendu complet
+        self.last_player_state = None  # (image, position) du sprite du joueur au dernier rendu
+        self.last_player_rect = None
+        self.blit_count = 0  # Nombre de blits de la dernière frame
+
+        # Tampon de défilement : carte composée hors écran, décalée quand la caméra bouge
+        self.map_buffer = sb.ScrollBuffer()
+
+        # Rendu basse résolution : image composée au zoom 1 puis agrandie une seule fois par frame
+        self.lowres = lowres
+        self.lowres_frame = None
+        self.lowres_scaled = None
+
+        # Déplacement au clic : cases restant à parcourir (voir move_to), ou None
+        self.path = None
+
+        # Transition de téléportation en cours : None ou {"target", "spawn", "phase", "elapsed"}
+        self.transition = None
+        self.fade_surface = None
+
         # Affichage des téléporteurs (débogage)
         self.show_teleporters = False  # Par défaut, les téléporteurs ne sont pas affichés
 
+        # Instrumentation : minuteurs et compteurs par frame, affichables à l'écran (touche P)
+        # et exportables en CSV (touche O)
+        self.profiler = pf.Profiler()
+        self.show_profiler = False
+        self.last_cache_stats = None  # (carte, succès/échecs des caches) à la frame précédente
+
     def load_animations(self):
         """
         Charge les sprites d’animation pour chaque direction du joueur.
@@ -70,7 +154,7 @@ class Game:
                     image = pygame.image.load(path).convert_alpha()
                     frames.append(image)
                 except pygame.error as e:
-                    print(f"[ERROR] Impossible de charger {path}: {e}")
+                    log.error("Impossible de charger %s: %s", path, e)
             animations[direction] = frames
         return animations
 
@@ -84,30 +168,25 @@ class Game:
             joystick = pygame.joystick.Joystick(i)
             joystick.init()
             joysticks.append(joystick)
-            print(f"[DEBUG] Joystick détecté : {joystick.get_name()}")
+            log.debug("Joystick détecté : %s", joystick.get_name())
         return joysticks
 
-    def find_valid_spawn(self, preferred_x, preferred_y):
+    def find_valid_spawn(self, preferred_x, preferred_y, game_map=None):
         """
-        Recherche une tuile de spawn valide, en évitant les tuiles bloquantes.
+        Recherche une tuile de spawn valide, en évitant les tuiles bloquantes : la tuile libre la plus
+        proche de la tuile préférée, dans une zone atteignable depuis les entrées de la carte
+        (voir SpawnResolver). game_map vaut par défaut la carte courante.
         """
-        collidable = self.map.collidable_tiles
-        map_w = self.map.map_width
-        map_h = self.map.map_height
-
-        if (0 <= preferred_x < map_w and
-                0 <= preferred_y < map_h and
-                (preferred_x, preferred_y) not in collidable):
-            return float(preferred_x), float(preferred_y)
-        else:
-            print(f"[DEBUG] (preferred_x, preferred_y)=({preferred_x},{preferred_y}) est bloquant ou hors map.")
-            for ty in range(map_h):
-                for tx in range(map_w):
-                    if (tx, ty) not in collidable:
-                        print(f"[DEBUG] Trouvé spawn libre => ({tx},{ty})")
-                        return float(tx), float(ty)
-            print("[DEBUG] Aucune tuile libre trouvée dans la map ! Spawn en (0,0)")
+        game_map = game_map or self.map
+        entry_points = self.teleporter.get_entry_points(game_map.map_file)
+        spawn = game_map.spawn_resolver.resolve(preferred_x, preferred_y, entry_points)
+        if spawn is None:
+            log.debug("Aucune tuile libre trouvée dans la map ! Spawn en (0,0)")
             return 0.0, 0.0
+        if spawn != (preferred_x, preferred_y):
+            log.debug("(preferred_x, preferred_y)=(%s,%s) est bloquant, hors map ou isolé : spawn libre => (%s,%s)",
+                      preferred_x, preferred_y, *spawn)
+        return float(spawn[0]), float(spawn[1])
 
     def handle_keyboard_input(self):
         """
@@ -170,69 +249,209 @@ class Game:
                 pygame.quit()
                 sys.exit()
 
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # Le contenu de la fenêtre a pu être perdu : forcer un rendu complet
+                self.last_view = None
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
                 elif event.key in (pygame.K_PLUS, pygame.K_KP_PLUS):
-                    self.zoom += 0.1
+                    self.zoom = tc.quantize_zoom(self.zoom + tc.ZOOM_STEP)
                     if self.zoom > 5.0:
                         self.zoom = 5.0
-                    self.map.scaled_tiles_cache.clear()
-                    print(f"[DEBUG] Zoom augmenté à {self.zoom}")
+                    self.prepare_zoom()
+                    log.debug("Zoom augmenté à %s", self.zoom)
                 elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
-                    self.zoom -= 0.1
+                    self.zoom = tc.quantize_zoom(self.zoom - tc.ZOOM_STEP)
                     if self.zoom < 0.1:
                         self.zoom = 0.1
-                    self.map.scaled_tiles_cache.clear()
-                    print(f"[DEBUG] Zoom diminué à {self.zoom}")
+                    self.prepare_zoom()
+                    log.debug("Zoom diminué à %s", self.zoom)
                 elif event.key == pygame.K_c:
                     self.collision_enabled = not self.collision_enabled
-                    print(f"[DEBUG] Collisions {'activées' if self.collision_enabled else 'désactivées'}")
+                    log.debug("Collisions %s", 'activées' if self.collision_enabled else 'désactivées')
                 elif event.key == pygame.K_t:
                     self.show_teleporters = not self.show_teleporters
-                    print(f"[DEBUG] Affichage des téléporteurs {'activé' if self.show_teleporters else 'désactivé'}")
+                    log.debug("Affichage des téléporteurs %s", 'activé' if self.show_teleporters else 'désactivé')
+                elif event.key == pygame.K_l:
+                    self.lowres = not self.lowres
+                    self.last_view = None
+                    if not self.lowres:
+                        self.prepare_zoom()
+                    log.debug("Rendu basse résolution %s", 'activé' if self.lowres else 'désactivé')
+                elif event.key == pygame.K_p:
+                    self.show_profiler = not self.show_profiler
+                    self.last_view = None
+                    log.debug("Affichage du profilage %s", 'activé' if self.show_profiler else 'désactivé')
+                elif event.key == pygame.K_o:
+                    filename = time.strftime("profil_%Y%m%d_%H%M%S.csv")
+                    frames = self.profiler.dump_csv(filename)
+                    log.info("Profilage exporté dans %s (%s frames)", filename, frames)
+
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                self.move_to(*self.screen_to_tile(*event.pos))
 
             elif event.type == pygame.JOYBUTTONDOWN:
                 # Exemple : Toggle collision avec le bouton 0 (A sur manette Xbox)
                 if event.button == 0:
                     self.collision_enabled = not self.collision_enabled
-                    print(f"[DEBUG] Collisions {'activées' if self.collision_enabled else 'désactivées'} via manette")
+                    log.debug("Collisions %s via manette", 'activées' if self.collision_enabled else 'désactivées')
 
 
+    def prepare_zoom(self):
+        """
+        Lance la préparation en arrière-plan du nouveau niveau de zoom, sans vider les niveaux déjà en cache.
+        Inutile en rendu basse résolution : la carte y est toujours composée au zoom 1.
+        """
+        if self.lowres:
+            return
+        camera_x, camera_y = self.get_camera(self.zoom)
+        self.map.prepare_zoom(self.screen, camera_x, camera_y, self.zoom)
+
+    def screen_to_tile(self, screen_x, screen_y):
+        """
+        Convertit une position à l'écran (en pixels) en coordonnées de tuile sur la carte courante.
+        """
+        zoom = self.zoom if self.lowres else self.map.resolve_zoom(self.zoom)
+        camera_x, camera_y = self.get_camera(zoom)
+        return (math.floor((camera_x + screen_x) / (self.map.tile_width * zoom)),
+                math.floor((camera_y + screen_y) / (self.map.tile_height * zoom)))
+
+    def move_to(self, target_x, target_y):
+        """
+        Déplacement au clic : calcule le chemin du joueur jusqu'à la tuile visée (ou, si elle est
+        bloquante, jusqu'à la tuile libre la plus proche qu'il peut atteindre), parcouru ensuite
+        case par case par update, sans traverser de zone de téléportation (sauf si elle est visée :
+        le chemin mène alors à la case la plus proche de cette porte). Retourne False si aucun chemin n'existe.
+        """
+        # Un déplacement en cours se termine avant de suivre le chemin : il part de la case visée
+        if self.player.is_moving:
+            start_x, start_y = int(round(self.player.move_target_x)), int(round(self.player.move_target_y))
+        else:
+            start_x, start_y = int(round(self.player.position_x)), int(round(self.player.position_y))
+        goal = self.map.spawn_resolver.resolve(target_x, target_y, [(start_x, start_y)])
+        path = None
+        if goal:
+            # Vers une porte : chemin lu dans le champ de distance en cache de la porte, sinon A*
+            door = next((target for target in self.get_path_targets() if goal in target[0]), None)
+            if door is not None:
+                path = self.map.pathfinder.follow_field(start_x, start_y, *door)
+            if path is None:
+                doors = [coord for zone in self.teleporter.get_zones(self.current_map_file) for coord in zone["coordinates"]]
+                path = self.map.pathfinder.find_path(start_x, start_y, *goal, avoid=doors)
+        if path is None:
+            log.debug("Aucun chemin vers (%s,%s)", target_x, target_y)
+            return False
+        log.debug("Chemin vers %s : %s cases", goal, len(path))
+        self.path = path
+        return True
+
     def check_teleporters(self):
         """
-        Vérifie si le joueur doit être téléporté.
+        Vérifie si le joueur doit être téléporté : la carte de destination se charge en arrière-plan
+        pendant un fondu au noir (voir update_transition).
         """
-        new_map, new_position = self.teleporter.check_teleportation(self.player)
-        if new_map:
-            self.map = new_map
-            self.player.position_x, self.player.position_y = new_position
-            print(f"[INFO] Joueur téléporté à la carte {self.map} avec position {new_position}")
-            
+        target_map, new_position = self.teleporter.check_teleportation(self.player, self.current_map_file)
+        if target_map:
+            self.transition = {"target": target_map, "spawn": new_position, "phase": "out", "elapsed": 0.0,
+                               "prepared": False}
+
+    def update_transition(self, dt):
+        """
+        Fait avancer la transition de téléportation : fondu au noir, attente éventuelle de la fin
+        du chargement et de la préparation des tuiles à l'arrivée (écran noir, la boucle de rendu continue),
+        changement de carte puis retour du fondu.
+        """
+        transition = self.transition
+        transition["elapsed"] += dt
+        if transition["elapsed"] < FADE_DURATION:
+            return
+        if transition["phase"] == "in":
+            self.transition = None
+            return
+
+        new_map = self.maps.request(transition["target"])
+        if new_map is None:
+            return  # Chargement en cours : on reste sur l'écran noir
+        map_zoom = LOWRES_MAP_ZOOM if self.lowres else self.zoom
+        if not transition["prepared"]:
+            # Position d'arrivée du JSON validée comme un spawn : libre et atteignable
+            spawn = self.find_valid_spawn(*transition["spawn"], game_map=new_map)
+            if spawn != tuple(transition["spawn"]):
+                log.warning("Position d'arrivée %s invalide sur %s, remplacée par %s",
+                            transition["spawn"], new_map.map_file, spawn)
+            transition["spawn"] = spawn
+            # Tuiles et chunks visibles à l'arrivée construits en arrière-plan, pas au premier rendu
+            spawn_x, spawn_y = transition["spawn"]
+            camera_x = spawn_x * new_map.tile_width * map_zoom - self.screen.get_width() / 2 * map_zoom / self.zoom
+            camera_y = spawn_y * new_map.tile_height * map_zoom - self.screen.get_height() / 2 * map_zoom / self.zoom
+            new_map.prepare_zoom(self.screen, camera_x, camera_y, map_zoom)
+            transition["prepared"] = True
+        if not new_map.is_zoom_ready(map_zoom):
+            return
+        self.map = new_map
+        self.current_map_file = new_map.map_file
+        self.maps.set_current(self.current_map_file)
+        self.path = None
+        self.entities.set_tile_size(new_map.tile_width, new_map.tile_height)
+        self.player.reset_position(*transition["spawn"])
+        self.populate_npcs()
+        self.teleporter.preload_destinations(self.player, self.current_map_file)
+        log.info("Joueur téléporté à la carte %s avec position %s", self.current_map_file, transition["spawn"])
+        transition["phase"] = "in"
+        transition["elapsed"] = 0.0
+
+    def get_fade(self, alpha=1.0):
+        """
+        Retourne l'opacité (0 à 255) du voile noir de la transition, interpolée entre deux ticks.
+        """
+        if self.transition is None:
+            return 0
+        progress = min(1.0, (self.transition["elapsed"] + alpha * TICK_DURATION) / FADE_DURATION)
+        if self.transition["phase"] == "in":
+            progress = 1.0 - progress
+        return int(progress * 255)
+
 
     def load_map(self, map_file, spawn_coords):
         """
         Charge une nouvelle carte et positionne le joueur aux coordonnées de spawn spécifiées.
         """
+        self.transition = None
+        self.path = None
         self.current_map_file = map_file
-        self.map = m.Map(self.current_map_file, "collidable_layers.json")
-        self.player.tile_width = self.map.tile_width
-        self.player.tile_height = self.map.tile_height
-        self.player.position_x, self.player.position_y = spawn_coords
-        self.player.move_start_x = self.player.position_x
-        self.player.move_start_y = self.player.position_y
-        self.player.move_target_x = self.player.position_x
-        self.player.move_target_y = self.player.position_y
-        self.player.is_moving = False
-        print(f"[DEBUG] Carte chargée : {map_file}, Spawn position : {spawn_coords}")
-
-    def update(self, direction_x, direction_y):
+        self.map = self.maps.get(self.current_map_file)
+        self.entities.set_tile_size(self.map.tile_width, self.map.tile_height)
+        self.player.reset_position(*spawn_coords)
+        self.populate_npcs()
+        self.teleporter.preload_destinations(self.player, self.current_map_file)
+        log.debug("Carte chargée : %s, Spawn position : %s", map_file, spawn_coords)
+
+    def update(self, direction_x, direction_y, dt=TICK_DURATION):
         """
-        Met à jour l'état du jeu, y compris le déplacement du joueur.
+        Avance l'état du jeu d'un tick de simulation (dt secondes), y compris le déplacement du joueur.
+        Le joueur se tourne vers le pas demandé (direction_x, direction_y) ; une diagonale (clavier et
+        manette combinés) est ramenée au pas de l'orientation courante, pour que la tuile vérifiée
+        soit toujours celle où le joueur se rend. Pendant une transition de téléportation,
+        les déplacements sont ignorés.
         """
+        if self.transition is not None:
+            self.update_transition(dt)
+            return
+
         if not self.player.is_moving:
             if direction_x != 0 or direction_y != 0:
+                self.path = None  # Une entrée clavier ou manette annule le déplacement au clic
+            elif self.path:
+                next_x, next_y = self.path.pop(0)
+                direction_x = next_x - int(round(self.player.position_x))
+                direction_y = next_y - int(round(self.player.position_y))
+            if direction_x != 0 or direction_y != 0:
+                direction = STEP_DIRECTIONS.get((direction_x, direction_y), self.player.direction)
+                direction_x, direction_y = DIRECTION_STEPS[direction]
+                self.player.direction = direction
                 current_x = int(round(self.player.position_x))
                 current_y = int(round(self.player.position_y))
                 target_x = current_x + direction_x
@@ -240,58 +459,351 @@ class Game:
 
                 # Vérifier les limites de la map
                 if 0 <= target_x < self.map.map_width and 0 <= target_y < self.map.map_height:
-                    if self.collision_enabled and (target_x, target_y) in self.map.collidable_tiles:
-                        print(f"[DEBUG] Tuile bloquante: ({target_x},{target_y}). Mouvement annulé.")
+                    if self.collision_enabled and self.map.collision_grid.is_blocked(target_x, target_y):
+                        log.debug("Tuile bloquante: (%s,%s). Mouvement annulé.", target_x, target_y)
+                        self.path = None
                     else:
-                        print(f"[DEBUG] Déplacement validé: ({current_x},{current_y}) -> ({target_x},{target_y})")
-                        self.player.start_move(self.player.direction)
+                        log.debug("Déplacement validé: (%s,%s) -> (%s,%s)", current_x, current_y, target_x, target_y)
+                        self.player.start_move(direction)
                 else:
-                    print(f"[DEBUG] Hors map: ({target_x},{target_y})")
+                    log.debug("Hors map: (%s,%s)", target_x, target_y)
 
-        self.player.update_position()
+        self.update_npcs()
+        self.entities.update(dt)
         self.check_teleporters()
 
+    def get_path_targets(self):
+        """
+        Retourne les cibles fréquentes de la carte courante, chacune (cases cibles, cases à éviter) :
+        chaque zone de téléportation (porte) puis chaque position d'arrivée, les autres portes étant évitées.
+        """
+        zones = [zone["coordinates"] for zone in self.teleporter.get_zones(self.current_map_file)]
+        doors = [coord for coordinates in zones for coord in coordinates]
+        targets = [(coordinates, [coord for coord in doors if coord not in coordinates]) for coordinates in zones]
+        targets += [([point], doors) for point in self.teleporter.get_arrival_points(self.current_map_file)]
+        return targets
+
+    def populate_npcs(self):
+        """
+        Remplace les PNJ par npc_count nouveaux PNJ placés au hasard sur les cases libres de la carte
+        courante atteignables par le joueur (même composante connexe, voir SpawnResolver), chacun
+        avec une cible tirée au hasard parmi les cibles fréquentes de la carte (get_path_targets).
+        """
+        for npc in self.npcs.tolist():
+            self.entities.remove(npc)
+        self.npcs = np.zeros(0, dtype=np.int64)
+        self.npc_goals = np.zeros(0, dtype=np.int64)
+        self.npc_targets = []
+        if self.npc_count == 0:
+            return
+
+        resolver = self.map.spawn_resolver
+        labels = np.frombuffer(resolver.labels, dtype=np.int32)
+        component = resolver.get_component(int(round(self.player.position_x)), int(round(self.player.position_y)))
+        cells = np.flatnonzero(labels == component if component != -1 else labels != -1)
+        if cells.size == 0:
+            return
+        cells = self.npc_random.choice(cells, self.npc_count)
+        sprite = int(self.entities.sprite[self.player.entity])
+        self.npcs = self.entities.add_many(cells % self.map.map_width, cells // self.map.map_width, sprite,
+                                           move_duration=NPC_MOVE_DURATION)
+        self.npc_targets = self.get_path_targets()
+        if self.npc_targets:
+            self.npc_goals = self.npc_random.integers(0, len(self.npc_targets), self.npcs.size)
+            self.npc_fields = np.zeros((len(self.npc_targets), self.map.map_width * self.map.map_height), dtype=np.intc)
+            self.npc_fields_built = np.zeros(len(self.npc_targets), dtype=np.bool_)
+        log.debug("%s PNJ placés sur %s", self.npcs.size, self.current_map_file)
+
+    def update_npcs(self):
+        """
+        Fait avancer les PNJ, tous en une passe vectorisée : chaque PNJ à l'arrêt repart avec une
+        probabilité NPC_MOVE_CHANCE d'un pas vers sa cible (voir get_npc_steps), ou d'un pas au hasard
+        s'il vient de l'atteindre ou ne peut pas l'atteindre, si la case visée est libre.
+        Les PNJ ne se bloquent pas entre eux et n'empruntent pas les téléporteurs.
+        """
+        if self.npcs.size == 0:
+            return
+        idle = np.flatnonzero(~self.entities.is_moving[self.npcs])
+        starting_index = idle[self.npc_random.random(idle.size) < NPC_MOVE_CHANCE]
+        if starting_index.size == 0:
+            return
+        starting = self.npcs[starting_index]
+        codes = self.npc_random.integers(0, len(en.DIRECTIONS), starting.size)
+        if self.npc_targets:
+            codes = self.get_npc_steps(starting_index, codes)
+        target_x = np.rint(self.entities.position_x[starting]).astype(np.int64) + en.DIRECTION_STEPS_X[codes]
+        target_y = np.rint(self.entities.position_y[starting]).astype(np.int64) + en.DIRECTION_STEPS_Y[codes]
+
+        grid = self.map.collision_grid
+        free = (target_x >= 0) & (target_x < grid.width) & (target_y >= 0) & (target_y < grid.height)
+        cells = np.frombuffer(grid.cells, dtype=np.uint8)
+        free[free] = cells[target_y[free] * grid.width + target_x[free]] == 0
+        self.entities.start_moves(starting[free], codes[free])
+
+    def get_npc_steps(self, npc_index, codes):
+        """
+        Retourne la direction du pas de chaque PNJ self.npcs[npc_index] : la descente du champ de
+        distance de sa cible, calculé au premier besoin puis partagé par tous les PNJ qui s'y rendent.
+        Au plus un champ est calculé par tick (quelques millisecondes) : en attendant le leur, les PNJ
+        gardent le pas au hasard de codes. Un PNJ arrivé (ou qui ne peut pas atteindre sa cible)
+        garde aussi ce pas et reçoit une nouvelle cible.
+        """
+        width = self.map.map_width
+        height = self.map.map_height
+        goals = self.npc_goals[npc_index]
+        missing = goals[~self.npc_fields_built[goals]]
+        if missing.size:
+            goal = int(missing[0])
+            self.npc_fields[goal] = np.frombuffer(self.map.pathfinder.get_field(*self.npc_targets[goal]), dtype=np.intc)
+            self.npc_fields_built[goal] = True
+        ready = self.npc_fields_built[goals]
+
+        npcs = self.npcs[npc_index]
+        x = np.rint(self.entities.position_x[npcs]).astype(np.int64)
+        y = np.rint(self.entities.position_y[npcs]).astype(np.int64)
+        current = self.npc_fields[goals, y * width + x]
+        # Distance à la cible depuis chacune des quatre cases voisines (une colonne par code de direction)
+        neighbour_x = x[:, None] + en.DIRECTION_STEPS_X
+        neighbour_y = y[:, None] + en.DIRECTION_STEPS_Y
+        inside = (neighbour_x >= 0) & (neighbour_x < width) & (neighbour_y >= 0) & (neighbour_y < height)
+        neighbours = np.where(inside, neighbour_y * width + neighbour_x, 0)
+        distances = np.where(inside, self.npc_fields[goals[:, None], neighbours], -1)
+        closer = (distances >= 0) & (distances < current[:, None])
+        has_step = closer.any(axis=1)
+        best = np.argmin(np.where(closer, distances, np.iinfo(np.intc).max), axis=1)
+
+        lost = npc_index[ready & ~has_step]
+        self.npc_goals[lost] = self.npc_random.integers(0, len(self.npc_targets), lost.size)
+        return np.where(ready & has_step, best, codes)
+
+
+    def get_camera(self, zoom, alpha=1.0):
+        """
+        Calcule la position de la caméra, centrée sur la position interpolée du joueur, pour un zoom donné.
+        """
+        position_x, position_y = self.player.get_render_position(alpha)
+        player_px = position_x * self.map.tile_width * zoom
+        player_py = position_y * self.map.tile_height * zoom
+        camera_x = player_px - self.screen.get_width() / 2
+        camera_y = player_py - self.screen.get_height() / 2
+        return camera_x, camera_y
 
-    def render(self):
+    def render(self, alpha=1.0):
         """
         Rend tous les éléments du jeu à l'écran.
+        alpha (entre 0 et 1) interpole l'affichage entre le tick précédent et le tick courant.
+        Si la caméra n'a pas bougé depuis le dernier rendu, seuls les rectangles touchés
+        par les sprites animés sont redessinés et envoyés à l'écran.
         """
-        self.screen.fill((0, 0, 0))
+        if self.lowres:
+            zoom = self.zoom
+            self.player.set_zoom(LOWRES_MAP_ZOOM)
+        else:
+            # Le niveau de zoom précédent reste affiché tant que le nouveau est en préparation
+            zoom = self.map.resolve_zoom(self.zoom)
+            # L'atlas de cadres du joueur n'est reconstruit que si le zoom a changé
+            self.player.set_zoom(zoom)
 
         # Calculer la position de la caméra
-        player_px = self.player.position_x * self.map.tile_width * self.zoom
-        player_py = self.player.position_y * self.map.tile_height * self.zoom
-        camera_x = player_px - self.screen.get_width() / 2
-        camera_y = player_py - self.screen.get_height() / 2
+        camera_x, camera_y = self.get_camera(zoom, alpha)
+
+        fade = self.get_fade(alpha)
+        view = (self.map, camera_x, camera_y, zoom, self.screen.get_size(), fade, self.lowres)
+        if self.show_profiler or self.npcs.size:
+            # Le panneau change à chaque frame, les PNJ bougent sans cesse : rendu complet
+            self.last_view = None
+        if fade == 255:
+            # Écran entièrement noir (chargement d'une carte) : inutile de dessiner la carte
+            if view != self.last_view:
+                self.screen.fill((0, 0, 0))
+                pygame.display.flip()
+                self.last_view = view
+        elif view != self.last_view:
+            self.render_full(camera_x, camera_y, zoom, alpha, fade)
+            self.last_view = view
+        elif self.lowres:
+            # Les rectangles modifiés n'ont pas de sens avant l'agrandissement : rendu complet si le joueur a changé
+            player_state = (self.player.get_current_frame(), self.player.get_draw_position(camera_x / zoom, camera_y / zoom, alpha))
+            if player_state != self.last_player_state:
+                self.render_full(camera_x, camera_y, zoom, alpha, fade)
+        else:
+            self.render_dirty(camera_x, camera_y, zoom, alpha)
 
-        # Rendre la carte avec les options de débogage
-        self.map.render(
-            self.screen,
-            camera_x,
-            camera_y,
-            self.zoom
-        )
+    def render_full(self, camera_x, camera_y, zoom, alpha, fade=0):
+        """
+        Redessine tout l'écran (caméra ou zoom modifiés) : la carte vient du tampon de défilement,
+        qui ne redessine que les bandes découvertes depuis la frame précédente.
+        fade (0 à 255) est l'opacité du voile noir d'une transition de téléportation.
+        """
+        if self.lowres:
+            self.render_lowres(camera_x, camera_y, zoom, alpha)
+        else:
+            with self.profiler.measure("map_render"):
+                map_surface = self.map_buffer.update(self.map, self.screen, camera_x, camera_y, zoom)
+                self.screen.blit(map_surface, (0, 0))
+
+            # Rendre les PNJ puis le joueur, par-dessus
+            with self.profiler.measure("npc_render"):
+                npc_blits = self.entities.render(self.screen, camera_x, camera_y, alpha, exclude=(self.player.entity,))
+            with self.profiler.measure("player_render"):
+                self.last_player_rect = self.player.render(self.screen, camera_x, camera_y, alpha)
+            self.last_player_state = (self.player.scaled_player_image, self.player.get_draw_position(camera_x, camera_y, alpha))
+            self.blit_count = self.map_buffer.blit_count + npc_blits + 2
+
+        if fade:
+            if self.fade_surface is None or self.fade_surface.get_size() != self.screen.get_size():
+                self.fade_surface = pygame.Surface(self.screen.get_size()).convert()
+            self.fade_surface.set_alpha(fade)
+            self.screen.blit(self.fade_surface, (0, 0))
+            self.blit_count += 1
+
+        if self.show_profiler:
+            self.profiler.render_overlay(self.screen, self.get_profiler_lines())
+
+        with self.profiler.measure("display_flip"):
+            pygame.display.flip()
+
+    def render_lowres(self, camera_x, camera_y, zoom, alpha):
+        """
+        Rendu basse résolution : la carte et le joueur sont composés au zoom 1 (atlas des tuiles d'origine
+        et chunks du zoom 1, via les caches habituels) dans une petite surface de la taille de l'écran
+        divisée par zoom, agrandie une seule fois avec pygame.transform.scale puis copiée à l'écran.
+        """
+        native_x = camera_x / zoom
+        native_y = camera_y / zoom
+        # Une colonne et une ligne de plus pour couvrir le décalage sous-pixel de la caméra
+        size = (math.ceil(self.screen.get_width() / zoom) + 1, math.ceil(self.screen.get_height() / zoom) + 1)
+        scaled_size = (round(size[0] * zoom), round(size[1] * zoom))
+        if self.lowres_frame is None or self.lowres_frame.get_size() != size:
+            self.lowres_frame = pygame.Surface(size).convert(self.screen)
+        if self.lowres_scaled is None or self.lowres_scaled.get_size() != scaled_size:
+            self.lowres_scaled = pygame.Surface(scaled_size).convert(self.screen)
+
+        with self.profiler.measure("map_render"):
+            map_surface = self.map_buffer.update(self.map, self.lowres_frame, native_x, native_y, LOWRES_MAP_ZOOM)
+            self.lowres_frame.blit(map_surface, (0, 0))
+        origin_x = self.map_buffer.origin_x
+        origin_y = self.map_buffer.origin_y
+
+        with self.profiler.measure("npc_render"):
+            npc_blits = self.entities.render(self.lowres_frame, origin_x, origin_y, alpha, exclude=(self.player.entity,))
+        with self.profiler.measure("player_render"):
+            self.last_player_rect = self.player.render(self.lowres_frame, origin_x, origin_y, alpha)
+        self.last_player_state = (self.player.scaled_player_image, self.player.get_draw_position(native_x, native_y, alpha))
+
+        with self.profiler.measure("upscale"):
+            pygame.transform.scale(self.lowres_frame, scaled_size, self.lowres_scaled)
+            self.screen.blit(self.lowres_scaled, ((origin_x - native_x) * zoom, (origin_y - native_y) * zoom))
+        self.blit_count = self.map_buffer.blit_count + npc_blits + 3
+
+    def render_dirty(self, camera_x, camera_y, zoom, alpha):
+        """
+        Caméra immobile : redessine uniquement les rectangles des sprites qui ont changé
+        (ancienne et nouvelle position) et ne pousse qu'eux vers l'écran.
+        """
+        self.blit_count = 0
+        player_image = self.player.get_current_frame()
+        self.player.scaled_player_image = player_image
+        player_state = (player_image, self.player.get_draw_position(camera_x, camera_y, alpha))
+        if player_state == self.last_player_state:
+            return  # Rien n'a changé : pas de rendu ni de mise à jour de l'écran
+
+        new_rect = player_image.get_rect(topleft=player_state[1])
+        dirty_rects = [rect.clip(self.screen.get_rect()) for rect in (self.last_player_rect, new_rect)]
+
+        # Le fond est recopié depuis le tampon de défilement, déjà à jour pour cette caméra
+        with self.profiler.measure("map_render"):
+            for rect in dirty_rects:
+                self.screen.blit(self.map_buffer.surface, rect, rect)
+                self.blit_count += 1
+        with self.profiler.measure("player_render"):
+            self.screen.set_clip(dirty_rects[0].union(dirty_rects[1]))
+            self.last_player_rect = self.player.render(self.screen, camera_x, camera_y, alpha)
+            self.screen.set_clip(None)
+        self.last_player_state = player_state
+        self.blit_count += 1
+
+        with self.profiler.measure("display_flip"):
+            pygame.display.update(dirty_rects)
+
+    def record_stats(self):
+        """
+        Enregistre dans le profileur les compteurs de la frame : blits, recherches de niveaux de zoom
+        du cache de tuiles (trouvés ou construits), succès et échecs du cache de chunks depuis
+        la frame précédente, et nombre total de cartes chargées.
+        """
+        self.profiler.count("blits", self.blit_count)
+        tile_cache = self.map.tile_cache
+        chunk_cache = self.map.chunk_cache
+        stats = (tile_cache.level_hits, tile_cache.level_misses, chunk_cache.hits, chunk_cache.misses)
+        if self.last_cache_stats is not None and self.last_cache_stats[0] is self.map:
+            previous = self.last_cache_stats[1]
+        else:
+            previous = (0, 0, 0, 0)
+        for name, value, old_value in zip(
+            ("tile_level_hits", "tile_level_misses", "chunk_cache_hits", "chunk_cache_misses"), stats, previous
+        ):
+            self.profiler.count(name, value - old_value)
+        self.last_cache_stats = (self.map, stats)
+        self.profiler.gauge("map_loads", self.maps.load_count)
+
+    def get_profiler_lines(self):
+        """
+        Retourne les lignes d'état ajoutées au panneau de profilage.
+        """
+        return [
+            f"carte {self.current_map_file.split('/')[-1]} - zoom {self.zoom}",
+            f"cartes en mémoire {len(self.maps.maps)} - chunks {len(self.map.chunk_cache.chunks)}",
+            "P : masquer - O : exporter en CSV",
+        ]
 
-        # Rendre le joueur
-        self.player.render(self.screen, camera_x, camera_y)
+    def read_input(self):
+        """
+        Lit les entrées clavier et manette et retourne la direction demandée.
+        """
+        with self.profiler.measure("handle_keyboard_input"):
+            direction_x_kb, direction_y_kb = self.handle_keyboard_input()
+        with self.profiler.measure("handle_joystick_input"):
+            direction_x_js, direction_y_js = self.handle_joystick_input()
 
-        pygame.display.flip()
+        # Prioriser les entrées clavier sur la manette
+        direction_x = direction_x_kb if direction_x_kb != 0 else direction_x_js
+        direction_y = direction_y_kb if direction_y_kb != 0 else direction_y_js
+        return direction_x, direction_y
 
     def run(self):
         """
-        Lance la boucle principale du jeu.
+        Lance la boucle principale du jeu : la simulation avance par ticks fixes de TICK_DURATION
+        (accumulateur), indépendamment du rendu qui interpole entre les deux derniers ticks.
         """
+        accumulator = 0.0
+        previous_time = time.perf_counter()
         while True:
-            self.clock.tick(60)  # Limiter à 60 FPS
-            self.handle_events()
+            now = time.perf_counter()
+            accumulator += min(now - previous_time, MAX_FRAME_TIME)
+            previous_time = now
 
-            # Gérer les entrées clavier et manette
-            direction_x_kb, direction_y_kb = self.handle_keyboard_input()
-            direction_x_js, direction_y_js = self.handle_joystick_input()
+            with self.profiler.measure("handle_events"):
+                self.handle_events()
+            direction_x, direction_y = self.read_input()
+
+            with self.profiler.measure("update"):
+                while accumulator >= TICK_DURATION:
+                    self.update(direction_x, direction_y, TICK_DURATION)
+                    accumulator -= TICK_DURATION
+
+            self.render(accumulator / TICK_DURATION)
+            self.record_stats()
 
-            # Prioriser les entrées clavier sur la manette
-            direction_x = direction_x_kb if direction_x_kb != 0 else direction_x_js
-            direction_y = direction_y_kb if direction_y_kb != 0 else direction_y_js
+            # Limiter la fréquence de rendu (max_fps=0 : non plafonné)
+            self.clock.tick(self.max_fps)
+            self.profiler.end_frame()
 
-            self.update(direction_x, direction_y)
-            self.render()
+    def simulate(self, ticks, controller=None):
+        """
+        Mode simulation pure (bots, tests) : enchaîne ticks appels à update aussi vite que le CPU
+        le permet, sans rendu ni attente. controller(game) retourne la direction (dx, dy) de chaque tick.
+        """
+        for _ in range(ticks):
+            direction_x, direction_y = controller(self) if controller else (0, 0)
+            self.update(direction_x, direction_y, TICK_DURATION)
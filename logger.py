@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# Niveau de log par défaut, modifiable via la variable d'environnement XERATH_LOG_LEVEL (DEBUG, INFO, ...)
+LOG_LEVEL = os.environ.get("XERATH_LOG_LEVEL", "INFO").upper()
+
+# Limitation de débit : au plus RATE_LIMIT_BURST messages identiques par RATE_LIMIT_INTERVAL secondes
+RATE_LIMIT_BURST = 5
+RATE_LIMIT_INTERVAL = 1.0
+
+ROOT_LOGGER_NAME = "xerath"
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, burst=RATE_LIMIT_BURST, interval=RATE_LIMIT_INTERVAL):
+        """
+        Filtre qui limite le nombre de messages émis pour un même modèle de message
+        (même logger, même niveau, même chaîne de format avant arguments).
+        """
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.windows = {}  # clé -> [début de la fenêtre, messages émis, messages ignorés]
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            window = self.windows[key] = [now, 0, 0]
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} messages similaires ignorés)"
+        if window[1] >= self.burst:
+            window[2] += 1
+            return False
+        window[1] += 1
+        return True
+
+
+def setup_logging(level=LOG_LEVEL, stream=None):
+    """
+    Configure le logger racine du jeu : les messages passent par une file (QueueHandler) et sont écrits
+    par un thread dédié (QueueListener), la boucle de jeu n'attend donc jamais la sortie standard.
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(level)
+    if _listener is not None:
+        return root
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+    root.addHandler(handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return root
+
+
+def get_logger(name):
+    """
+    Retourne le logger d'un module du jeu (ex. get_logger("map")), en configurant la journalisation au besoin.
+    Utiliser le formatage paresseux (log.debug("x=%s", x)) pour qu'un message désactivé ne coûte presque rien.
+    """
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
@@ -1,22 +1,459 @@
 import pygame
 import pytmx
+import numpy as np
+import io
 import json
+import math
+import mmap
+import array
+import os
+import struct
+import sys
+import hashlib
+import itertools
+import weakref
+import xml.etree.ElementTree as ET
 import teleport as t
+import chunks as c
+import tile_cache as tc
+import collision as col
+import occupancy as oc
+import spawn_resolver as sr
+import pathfinding as pth
+import tileset_registry as tr
+import logger as lg
+
+log = lg.get_logger("map")
+
+# Format binaire précompilé des cartes (voir map_compiler.py), en little-endian :
+#   en-tête BUNDLE_HEADER (magic, version, largeur, hauteur, taille des tuiles, nb de calques,
+#   nb de tuiles de l'atlas, empreinte SHA-1 des sources, empreinte SHA-1 de l'atlas), chemin de l'atlas PNG, liste des fichiers
+#   sources, rectangles des tuiles dans l'atlas, puis pour chaque calque son nom, ses drapeaux et
+#   sa grille de gids en uint16, et enfin la grille de collision (1 bit par tuile).
+BUNDLE_EXTENSION = ".xmap"
+BUNDLE_MAGIC = b"XMAP"
+BUNDLE_VERSION = 3
+BUNDLE_HEADER = struct.Struct("<4sHHHHHHH20s20s")
+BUNDLE_LAYER_DYNAMIC = 1
+
+# Drapeaux de la table gid -> propriétés de tuile (Map.tile_flags)
+TILE_FLAG_COLLIDES = 1  # Propriété Tiled "collides" : la tuile bloque quel que soit son calque
+
+def is_opaque_tile(image, size):
+    """
+    Indique si l'image d'une tuile recouvre entièrement une case de taille size (largeur, hauteur) :
+    mêmes dimensions, pas de couleur transparente et aucun pixel dont l'alpha est inférieur à 255.
+    """
+    if image is None or image.get_size() != size or image.get_colorkey() is not None:
+        return False
+    if image.get_flags() & pygame.SRCALPHA:
+        return int(pygame.surfarray.array_alpha(image).min()) == 255
+    alpha = image.get_alpha()
+    return alpha is None or alpha == 255
+
+
+# Jeux de tuiles partagés par toutes les cartes du processus (feuilles décodées, tuiles découpées)
+tilesets = tr.TilesetRegistry()
+
+
+def get_bundle_path(tmx_file):
+    """
+    Retourne le chemin du fichier précompilé associé à un fichier TMX.
+    """
+    return os.path.splitext(tmx_file)[0] + BUNDLE_EXTENSION
+
+
+def fingerprint_sources(source_files):
+    """
+    Calcule l'empreinte SHA-1 du contenu des fichiers sources d'une carte.
+    """
+    digest = hashlib.sha1()
+    for source_file in source_files:
+        with open(source_file, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def read_bundle_string(buffer, offset):
+    """
+    Lit une chaîne UTF-8 préfixée par sa longueur (uint16). Retourne (chaîne, nouvel offset).
+    """
+    (length,) = struct.unpack_from("<H", buffer, offset)
+    offset += 2
+    return bytes(buffer[offset:offset + length]).decode("utf-8"), offset + length
+
+
+def load_bundle(tmx_file, collidable_json):
+    """
+    Ouvre (par mmap) le fichier précompilé d'une carte s'il existe et est à jour.
+    Le fichier est à jour si aucune source n'est plus récente que lui ou, à défaut,
+    si l'empreinte de leur contenu n'a pas changé ; son atlas doit en plus avoir l'empreinte
+    enregistrée à la compilation. Retourne un dictionnaire décrivant la carte (atlas décodé
+    compris), ou None s'il faut se rabattre sur le TMX.
+    """
+    bundle_file = get_bundle_path(tmx_file)
+    if not os.path.exists(bundle_file):
+        return None
+
+    try:
+        with open(bundle_file, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:  # ValueError : fichier vide
+        log.warning("Fichier précompilé illisible %s (%s), chargement du TMX", bundle_file, e)
+        return None
+
+    try:
+        bundle = parse_bundle(buffer, bundle_file, collidable_json)
+    except (ValueError, TypeError, IndexError, struct.error, UnicodeDecodeError) as e:
+        log.warning("Fichier précompilé invalide ou tronqué %s (%s), chargement du TMX", bundle_file, e)
+        bundle = None
+    except (OSError, pygame.error) as e:
+        log.warning("Atlas illisible pour %s (%s), chargement du TMX", bundle_file, e)
+        bundle = None
+    if bundle is None:
+        buffer.close()
+    return bundle
+
+
+def parse_bundle(buffer, bundle_file, collidable_json):
+    """
+    Lit le contenu d'un fichier précompilé ouvert par mmap. Retourne le dictionnaire décrivant la carte,
+    ou None s'il n'est pas au format attendu ou plus à jour. Lève ValueError, struct.error... s'il est tronqué,
+    OSError ou pygame.error si l'atlas manque ou ne peut pas être décodé.
+    """
+    (magic, version, width, height, tile_width, tile_height,
+     layer_count, tile_count, fingerprint, atlas_fingerprint) = BUNDLE_HEADER.unpack_from(buffer, 0)
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+        return None
+    offset = BUNDLE_HEADER.size
+
+    bundle_dir = os.path.dirname(bundle_file)
+    atlas_file, offset = read_bundle_string(buffer, offset)
+    (source_count,) = struct.unpack_from("<H", buffer, offset)
+    offset += 2
+    source_files = []
+    for _ in range(source_count):
+        source_file, offset = read_bundle_string(buffer, offset)
+        source_files.append(os.path.normpath(os.path.join(bundle_dir, source_file)))
+
+    # Vérification de fraîcheur : d'abord par date de modification, puis par empreinte
+    if os.path.normpath(collidable_json) not in source_files:
+        return None
+    try:
+        bundle_mtime = os.path.getmtime(bundle_file)
+        if any(os.path.getmtime(source_file) > bundle_mtime for source_file in source_files):
+            if fingerprint_sources(source_files) != fingerprint:
+                return None
+    except OSError:
+        return None
+
+    # L'atlas doit être celui de cette compilation : une recompilation interrompue peut avoir
+    # remplacé l'atlas sans remplacer le .xmap
+    atlas_file = os.path.join(bundle_dir, atlas_file)
+    with open(atlas_file, "rb") as f:
+        atlas_data = f.read()
+    if hashlib.sha1(atlas_data).digest() != atlas_fingerprint:
+        log.warning("Atlas %s différent de celui du fichier précompilé, chargement du TMX", atlas_file)
+        return None
+    # Décodage seulement : la conversion et le découpage sont faits par Map.finish_loading()
+    tile_atlas = pygame.image.load(io.BytesIO(atlas_data), atlas_file)
+
+    tile_rects = [None]  # Le gid 0 correspond à l'absence de tuile
+    for _ in range(tile_count):
+        tile_rects.append(struct.unpack_from("<4H", buffer, offset))
+        offset += 8
+
+    layers = []
+    for _ in range(layer_count):
+        name, offset = read_bundle_string(buffer, offset)
+        flags = buffer[offset]
+        offset += 1 + (offset + 1) % 2  # Alignement des gids sur 2 octets
+        if sys.byteorder == "little":
+            gids = memoryview(buffer)[offset:offset + width * height * 2].cast("H")
+        else:
+            swapped = array.array("H", buffer[offset:offset + width * height * 2])
+            swapped.byteswap()
+            gids = memoryview(swapped)
+        gid_array = np.frombuffer(buffer, dtype="<u2", count=width * height, offset=offset)
+        offset += width * height * 2
+        rows = [gids[y * width:(y + 1) * width] for y in range(height)]
+        layers.append(MapLayer(
+            name,
+            rows,
+            {"dynamic": bool(flags & BUNDLE_LAYER_DYNAMIC)},
+            gid_array.reshape(height, width).astype(np.uint32)
+        ))
+
+    (collision_size,) = struct.unpack_from("<I", buffer, offset)
+    offset += 4
+    collision_bits = buffer[offset:offset + collision_size]
+    if len(collision_bits) != collision_size:
+        raise ValueError("grille de collision tronquée")
+
+    return {
+        "buffer": buffer,
+        "width": width,
+        "height": height,
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "tile_atlas": tile_atlas,
+        "tile_rects": tile_rects,
+        "layers": layers,
+        "collision_bits": collision_bits,
+    }
+
+
+def list_tilesets(tmx_file):
+    """
+    Retourne {firstgid: chemin absolu du .tsx} pour les jeux de tuiles externes d'un fichier TMX.
+    Les jeux de tuiles précèdent les calques : la lecture s'arrête au premier calque.
+    """
+    tmx_dir = os.path.dirname(tmx_file)
+    tileset_files = {}
+    for _, element in ET.iterparse(tmx_file, events=("start",)):
+        if element.tag == "tileset" and element.get("source"):
+            tileset_files[int(element.get("firstgid"))] = os.path.abspath(os.path.join(tmx_dir, element.get("source")))
+        elif element.tag in ("layer", "objectgroup", "imagelayer", "group"):
+            break
+    return tileset_files
+
+
+def release_tilesets(keys):
+    """
+    Rend au registre partagé les références de jeux de tuiles prises par une carte.
+    """
+    for key in keys:
+        tilesets.release(key)
+    keys.clear()
+
+
+class LazyTileImage:
+    def __init__(self, key, tile_id, colorkey, pixelalpha):
+        """
+        Tuile pas encore découpée : sa feuille n'est décodée (une seule fois pour tout le processus,
+        via le registre des jeux de tuiles) qu'au premier appel de resolve().
+        key identifie le jeu de tuiles et tile_id = (image, rectangle, drapeaux) la tuile dans ce jeu.
+        """
+        self.key = key
+        self.tile_id = tile_id
+        self.colorkey = colorkey
+        self.pixelalpha = pixelalpha
+        self.image = None
+
+    def resolve(self):
+        """
+        Retourne la Surface de la tuile (découpée, transformée et convertie comme le fait pytmx).
+        """
+        if self.image is None:
+            self.image = tilesets.get_tile(self.key, self.tile_id, self.colorkey, self.pixelalpha)
+        return self.image
+
+
+class MapLayer:
+    def __init__(self, name, data, properties=None, gid_array=None):
+        """
+        Calque de tuiles minimal, indépendant de pytmx : un nom, une grille de gids (data[y][x]),
+        des propriétés et éventuellement la même grille sous forme de tableau NumPy (gid_array).
+        """
+        self.name = name
+        self.data = data
+        self.properties = properties or {}
+        self.gid_array = gid_array
+
 
 class Map:
-    def __init__(self, tmx_file, collidable_json):
+    def __init__(self, tmx_file, collidable_json, chunk_size=c.CHUNK_SIZE, chunk_budget_bytes=c.CHUNK_BUDGET_BYTES,
+                 tile_cache_budget_bytes=tc.TILE_CACHE_BUDGET_BYTES, background_zoom=True, use_bundle=True,
+                 convert=True):
         """
         Initialise la carte en chargeant le fichier TMX et les calques bloquants ainsi que les téléporteurs depuis un JSON.
+        Si use_bundle=True et qu'un fichier précompilé (.xmap) à jour existe, il est utilisé à la place du TMX.
+        Les calques statiques sont pré-rendus par chunks de chunk_size tuiles, dans la limite de chunk_budget_bytes.
+        Les tuiles mises à l'échelle sont gardées par niveau de zoom dans la limite de tile_cache_budget_bytes ;
+        si background_zoom=True, un nouveau niveau de zoom est construit en arrière-plan.
+        Avec convert=False (chargement dans un thread), les images sont décodées mais pas converties
+        au format de l'écran : finish_loading() doit ensuite être appelé depuis le thread principal.
+        """
+        self.map_file = tmx_file
+        self.chunk_size = chunk_size
+        self.tileset_keys = []  # Références prises sur le registre des jeux de tuiles partagés
+        self.release_tilesets = weakref.finalize(self, release_tilesets, self.tileset_keys)
+        bundle = load_bundle(tmx_file, collidable_json) if use_bundle else None
+        if bundle:
+            self.load_from_bundle(bundle, collidable_json)
+        else:
+            self.load_from_tmx(tmx_file, collidable_json)
+        self.static_layers, self.dynamic_layers = self.split_static_layers()
+        self.used_gids = self.collect_used_gids()
+        self.opaque_tiles = None  # Tables gid -> tuile opaque / tuile contenue dans sa case (voir classify_tiles)
+        self.visible_layers = None  # Calques sans les tuiles masquées (voir compute_occlusion)
+        self.tile_cache = tc.TileCache(self, tile_cache_budget_bytes, background_zoom)
+        self.chunk_cache = c.ChunkCache(self, chunk_size, chunk_budget_bytes)
+        self.blit_count = 0  # Nombre de blits de la dernière frame
+        self.teleporters = self.load_teleporters(collidable_json)
+        log.debug("Nombre total de tuiles bloquantes = %s", self.collision_grid.count())
+        self.spawn_resolver = sr.SpawnResolver(self.collision_grid)  # Composantes libres, pour placer le joueur
+        self.pathfinder = pth.Pathfinder(self.collision_grid, self.spawn_resolver.labels)
+        self.ready = False
+        if convert:
+            self.finish_loading()
+        elif self.tmx_data is not None:
+            self.decode_tilesets()
+
+    def load_from_tmx(self, tmx_file, collidable_json):
+        """
+        Charge la carte depuis le fichier TMX avec pytmx. Les images des tuiles ne sont décodées
+        qu'au premier affichage, et les jeux de tuiles sont partagés avec les autres cartes.
         """
-        self.tmx_data = pytmx.util_pygame.load_pygame(tmx_file)
+        tileset_keys = {}
+        for firstgid, tsx_file in list_tilesets(tmx_file).items():
+            tileset_keys[firstgid] = tilesets.acquire(tsx_file)
+            self.tileset_keys.append(tileset_keys[firstgid])
+
+        def image_loader(filename, colorkey, tileset=None, **kwargs):
+            # Chargeur pytmx : une LazyTileImage par tuile au lieu d'une Surface décodée
+            key = tileset_keys.get(tileset.firstgid) if tileset is not None else None
+            if key is None:
+                key = tilesets.acquire(filename)
+                self.tileset_keys.append(key)
+            if colorkey:
+                colorkey = pygame.Color(f"#{colorkey}")
+            pixelalpha = kwargs.get("pixelalpha", True)
+
+            def load_image(rect=None, flags=None):
+                return LazyTileImage(key, (filename, rect, flags), colorkey, pixelalpha)
+
+            return load_image
+
+        self.tmx_data = pytmx.TiledMap(tmx_file, image_loader=image_loader)
+        self.tile_images = None
         self.tile_width = self.tmx_data.tilewidth
         self.tile_height = self.tmx_data.tileheight
         self.map_width = self.tmx_data.width
         self.map_height = self.tmx_data.height
-        self.collidable_tiles, self.teleporters_layer = self.load_layers(collidable_json)
-        self.scaled_tiles_cache = {}
-        self.teleporters = self.load_teleporters(collidable_json)
-        print(f"[DEBUG] Nombre total de tuiles bloquantes = {len(self.collidable_tiles)}")
+        self.tile_layers = [
+            layer for layer in self.tmx_data.visible_layers
+            if isinstance(layer, pytmx.TiledTileLayer)
+        ]
+        self.extract_layer_arrays()
+        self.compute_occupancy()
+        self.tile_flags = self.build_tile_flags()
+        self.collision_grid, self.teleporters_layer = self.load_layers(collidable_json)
+
+    def load_from_bundle(self, bundle, collidable_json):
+        """
+        Charge la carte depuis son fichier précompilé : les grilles de gids restent dans le mmap,
+        les tuiles sont découpées dans l'atlas PNG et la grille de collision est déjà calculée.
+        """
+        self.bundle_buffer = bundle["buffer"]  # Garde le mmap ouvert tant que la carte existe
+        self.tmx_data = None
+        self.tile_width = bundle["tile_width"]
+        self.tile_height = bundle["tile_height"]
+        self.map_width = bundle["width"]
+        self.map_height = bundle["height"]
+        self.tile_layers = bundle["layers"]
+        self.extract_layer_arrays()
+        self.compute_occupancy()
+        # Les collisions sont déjà précalculées : la table des drapeaux reste vide
+        self.tile_flags = np.zeros(len(bundle["tile_rects"]), dtype=np.uint8)
+
+        self.tile_atlas = bundle["tile_atlas"]  # Décodé par load_bundle, converti par finish_loading()
+        self.tile_rects = bundle["tile_rects"]
+        self.tile_images = None
+
+        self.collision_grid = col.CollisionGrid.from_bitmap(self.map_width, self.map_height, bundle["collision_bits"])
+        with open(collidable_json, "r", encoding="utf-8") as f:
+            self.teleporters_layer = json.load(f).get("teleporters_layer", "teleporters")
+
+    def get_tile_image(self, gid):
+        """
+        Retourne l'image originale (non mise à l'échelle) d'une tuile.
+        """
+        if self.tmx_data is None:
+            if self.tile_images is None:
+                self.finish_loading()
+            return self.tile_images[gid]
+        image = self.tmx_data.get_tile_image_by_gid(gid)
+        return image.resolve() if image else None
+
+    def decode_tilesets(self):
+        """
+        Décode les feuilles de tuiles utilisées par la carte (sans conversion : peut tourner dans un thread).
+        """
+        for gid in self.used_gids:
+            image = self.tmx_data.get_tile_image_by_gid(gid)
+            if image:
+                tilesets.load_sheet(image.key, image.tile_id[0])
+
+    def finish_loading(self):
+        """
+        Dernière étape du chargement, à faire dans le thread principal : conversion au format de l'écran
+        de l'atlas d'un fichier précompilé, ou des tuiles utilisées par une carte TMX (découpées dans
+        les feuilles déjà décodées). Sans effet si déjà fait. Les threads de construction des niveaux
+        de zoom ne font ainsi que mettre à l'échelle des surfaces déjà converties.
+        """
+        if self.ready:
+            return
+        if self.tmx_data is None:
+            atlas = self.tile_atlas.convert_alpha()
+            self.tile_images = [None] + [atlas.subsurface(rect) for rect in self.tile_rects[1:]]
+            self.tile_atlas = None
+        else:
+            for gid in self.used_gids:
+                image = self.tmx_data.get_tile_image_by_gid(gid)
+                if image:
+                    image.resolve()
+        self.ready = True
+
+    def scale_tile_image(self, gid, size):
+        """
+        Retourne l'image d'une tuile redimensionnée à size (largeur, hauteur), ou None si elle n'a pas d'image.
+        """
+        original_image = self.get_tile_image(gid)
+        if original_image is None:
+            return None
+        return pygame.transform.scale(original_image, size)
+
+    def close(self):
+        """
+        Libère les références de la carte sur les jeux de tuiles partagés (appelé à l'éviction du registre
+        de cartes ; sinon automatiquement quand la carte est détruite) et les champs de distance en cache.
+        """
+        self.release_tilesets()
+        self.pathfinder.clear()
+
+    def extract_layer_arrays(self):
+        """
+        Expose la grille de gids de chaque calque sous forme de tableau NumPy uint32
+        de forme (hauteur, largeur) : layer.gid_array.
+        """
+        for layer in self.tile_layers:
+            if getattr(layer, "gid_array", None) is None:
+                # Passer par array.array est nettement plus rapide que np.array sur une liste de listes
+                gids = array.array("I", itertools.chain.from_iterable(layer.data))
+                layer.gid_array = np.frombuffer(gids, dtype=np.uint32).reshape(self.map_height, self.map_width)
+
+    def build_tile_flags(self):
+        """
+        Construit la table gid -> drapeaux (TILE_FLAG_*) à partir des propriétés des tuiles du TMX,
+        pour remplacer les recherches de propriétés tuile par tuile par une indexation NumPy.
+        """
+        tile_flags = np.zeros(max(1, len(self.tmx_data.images)), dtype=np.uint8)
+        for gid in range(1, len(tile_flags)):
+            properties = self.tmx_data.get_tile_properties_by_gid(gid)
+            if properties and properties.get("collides"):
+                tile_flags[gid] |= TILE_FLAG_COLLIDES
+        return tile_flags
+
+    def compute_occupancy(self):
+        """
+        Calcule l'occupation de chaque calque de tuiles (layer.occupancy, voir LayerOccupancy) :
+        le rendu et la construction des collisions sautent ainsi les calques et zones sans tuile.
+        """
+        for layer in self.tile_layers:
+            layer.occupancy = oc.LayerOccupancy(layer.gid_array, self.chunk_size)
+            if layer.occupancy.is_empty():
+                log.debug("Layer '%s' vide.", layer.name)
 
     def load_layers(self, json_layers_file):
         with open(json_layers_file, "r", encoding="utf-8") as f:
@@ -25,26 +462,113 @@ class Map:
         collidable_layer_names = set(data.get("layers", []))
         teleporters_layer_name = data.get("teleporters_layer", "teleporters")
 
-        collidable_tiles = set()
+        blocking = np.zeros((self.map_height, self.map_width), dtype=bool)
         total_count = 0  # Initialisation du comptage total des tuiles bloquantes
+        has_collides_tiles = bool((self.tile_flags & TILE_FLAG_COLLIDES).any())
+
+        for layer in self.tile_layers:
+            if layer.name in collidable_layer_names:
+                layer_mask = layer.gid_array != 0
+                count_added = int(np.count_nonzero(layer_mask))
+                blocking |= layer_mask
+                total_count += count_added
+                log.debug("Layer '%s' => %s tuiles ajoutées comme bloquantes.", layer.name, count_added)
+            else:
+                log.debug("Layer '%s' ignoré pour collisions.", layer.name)
+            if has_collides_tiles and not layer.occupancy.is_empty():
+                # Tuiles ayant la propriété "collides", via la table gid -> drapeaux
+                blocking |= (self.tile_flags[layer.gid_array] & TILE_FLAG_COLLIDES) != 0
 
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                if layer.name in collidable_layer_names:
-                    count_added = 0
-                    for x, y, gid in layer:
-                        if gid != 0:
-                            collidable_tiles.add((x, y-1))  # Ajout sans -1
-                            count_added += 1
-                            total_count += 1
-                    print(f"[DEBUG] Layer '{layer.name}' => {count_added} tuiles ajoutées comme bloquantes.")
-                else:
-                    print(f"[DEBUG] Layer '{layer.name}' ignoré pour collisions.")
+        # Une tuile en (x, y) bloque la case (x, y-1)
+        shifted = np.zeros_like(blocking)
+        shifted[:-1] = blocking[1:]
 
-        print(f"[DEBUG] Nombre total de tuiles bloquantes = {total_count}")
-        return collidable_tiles, teleporters_layer_name
+        log.debug("Nombre total de tuiles bloquantes = %s", total_count)
+        return col.CollisionGrid.from_mask(shifted), teleporters_layer_name
 
 
+    def split_static_layers(self):
+        """
+        Sépare les calques de tuiles visibles en calques statiques (pré-rendus par chunks)
+        et calques dynamiques (propriété Tiled "dynamic" à true, redessinés à chaque frame).
+        """
+        static_layers = []
+        dynamic_layers = []
+        for layer in self.tile_layers:
+            if layer.properties.get("dynamic", False):
+                dynamic_layers.append(layer)
+            else:
+                static_layers.append(layer)
+        return static_layers, dynamic_layers
+
+    def collect_used_gids(self):
+        """
+        Retourne l'ensemble des gids réellement utilisés par les calques visibles.
+        """
+        arrays = [layer.gid_array.ravel() for layer in self.static_layers + self.dynamic_layers]
+        if not arrays:
+            return set()
+        gids = np.concatenate(arrays)
+        present = np.zeros(int(gids.max()) + 1, dtype=bool)
+        present[gids] = True
+        present[0] = False
+        return set(np.flatnonzero(present).tolist())
+
+    def classify_tiles(self):
+        """
+        Classe une fois pour toutes les tuiles utilisées par la carte d'après leur canal alpha.
+        Retourne deux tables NumPy indexées par gid : opaque (la tuile recouvre toute sa case)
+        et contained (l'image ne déborde pas de sa case : elle peut être masquée par une tuile opaque).
+        """
+        if self.opaque_tiles is None:
+            size = (self.tile_width, self.tile_height)
+            length = max(self.used_gids, default=0) + 1
+            opaque = np.zeros(length, dtype=bool)
+            contained = np.ones(length, dtype=bool)
+            for gid in self.used_gids:
+                image = self.get_tile_image(gid)
+                if image is not None:
+                    opaque[gid] = is_opaque_tile(image, size)
+                    contained[gid] = image.get_width() <= size[0] and image.get_height() <= size[1]
+            self.opaque_tiles = (opaque, contained)
+        return self.opaque_tiles
+
+    def compute_occlusion(self):
+        """
+        Élimine le surdessin : pour chaque case, repère le calque le plus haut (dans l'ordre de rendu,
+        calques statiques puis dynamiques) dont la tuile est opaque, et retire les tuiles des calques
+        en dessous. Retourne (calques statiques, calques dynamiques) à dessiner : des MapLayer dont
+        la grille ne contient plus les tuiles masquées, avec leur propre occupation.
+        Les grilles de gids sont supposées fixes après le chargement.
+        """
+        if self.visible_layers is not None:
+            return self.visible_layers
+
+        opaque, contained = self.classify_tiles()
+        layers = self.static_layers + self.dynamic_layers
+        cover = np.full((self.map_height, self.map_width), -1, dtype=np.int16)
+        for index, layer in enumerate(layers):
+            cover[opaque[layer.gid_array]] = index
+
+        visible_layers = []
+        hidden_count = 0
+        for index, layer in enumerate(layers):
+            hidden = (cover > index) & (layer.gid_array != 0) & contained[layer.gid_array]
+            count = int(np.count_nonzero(hidden))
+            if count == 0:
+                visible_layers.append(layer)
+                continue
+            hidden_count += count
+            gids = np.where(hidden, 0, layer.gid_array).astype(np.uint32)
+            visible = MapLayer(layer.name, [memoryview(row) for row in gids], layer.properties, gids)
+            visible.occupancy = oc.LayerOccupancy(gids, self.chunk_size)
+            visible_layers.append(visible)
+
+        log.debug("Tuiles masquées par des tuiles opaques : %s sur %s",
+                  hidden_count, sum(int(np.count_nonzero(layer.gid_array)) for layer in layers))
+        self.visible_layers = (visible_layers[:len(self.static_layers)], visible_layers[len(self.static_layers):])
+        return self.visible_layers
+
     def load_teleporters(self, json_layers_file):
         """
         Charge les téléporteurs depuis un fichier JSON.
@@ -72,48 +596,103 @@ class Map:
                     "target_map": target_map,
                     "target_spawn": (target_spawn.get("x", 0), target_spawn.get("y", 0))
                 })
-                print(f"[DEBUG] Téléporteur ajouté: Zone={zone}, Target Map={target_map}, Target Spawn={target_spawn}")
+                log.debug("Téléporteur ajouté: Zone=%s, Target Map=%s, Target Spawn=%s", zone, target_map, target_spawn)
             else:
-                print(f"[WARNING] Téléporteur mal configuré dans le JSON: {teleporter}")
+                log.warning("Téléporteur mal configuré dans le JSON: %s", teleporter)
 
         return teleporters
 
-    def get_scaled_tile_image(self, gid, zoom):
+    def get_tile_atlas(self, zoom):
         """
-        Récupère et redimensionne l'image d'une tuile en utilisant le cache.
+        Récupère les tuiles redimensionnées d'un niveau de zoom : ((atlas alpha, atlas opaque), {gid: (atlas source, rectangle)}).
         """
-        if (gid, zoom) in self.scaled_tiles_cache:
-            return self.scaled_tiles_cache[(gid, zoom)]
+        return self.tile_cache.get_level(zoom)
 
-        original_image = self.tmx_data.get_tile_image_by_gid(gid)
-        if original_image is None:
-            return None
+    def prepare_zoom(self, screen, camera_x, camera_y, zoom):
+        """
+        Prépare en arrière-plan un nouveau niveau de zoom : tuiles mises à l'échelle
+        et chunks visibles depuis la caméra donnée.
+        """
+        zoom = tc.quantize_zoom(zoom)
+        window = self.get_visible_tile_range(screen, camera_x, camera_y, zoom)
+
+        def bake(level_zoom, level):
+            return self.chunk_cache.bake(level_zoom, level, screen, *window)
+
+        self.tile_cache.prepare(zoom, bake)
+
+    def is_zoom_ready(self, zoom):
+        """
+        Indique si un niveau de zoom préparé par prepare_zoom() est prêt à être affiché.
+        """
+        return self.tile_cache.is_ready(zoom)
+
+    def resolve_zoom(self, zoom):
+        """
+        Retourne le zoom réellement affichable : l'ancien niveau reste utilisé
+        tant que le nouveau est en construction en arrière-plan.
+        """
+        for _, chunks in self.tile_cache.publish():
+            for key, surface in chunks.items():
+                self.chunk_cache.store(key, surface)
+        return self.tile_cache.resolve_zoom(zoom)
+
+    def get_visible_tile_range(self, screen, camera_x, camera_y, zoom):
+        """
+        Calcule le rectangle de tuiles visibles dans la zone de découpe de screen (bornes de fin exclues).
+        Retourne (first_x, first_y, last_x, last_y), borné aux dimensions de la carte.
+        Une marge d'un pixel couvre l'arrondi des positions de blit.
+        """
+        scaled_tile_width = self.tile_width * zoom
+        scaled_tile_height = self.tile_height * zoom
+        clip = screen.get_clip()
+
+        first_x = max(0, math.floor((camera_x + clip.left - 1) / scaled_tile_width))
+        first_y = max(0, math.floor((camera_y + clip.top - 1) / scaled_tile_height))
+        last_x = min(self.map_width, math.ceil((camera_x + clip.right + 1) / scaled_tile_width))
+        last_y = min(self.map_height, math.ceil((camera_y + clip.bottom + 1) / scaled_tile_height))
+        return first_x, first_y, max(first_x, last_x), max(first_y, last_y)
 
-        scaled_image = pygame.transform.scale(
-            original_image,
-            (int(self.tile_width * zoom), int(self.tile_height * zoom))
-        )
-        self.scaled_tiles_cache[(gid, zoom)] = scaled_image
-        return scaled_image
-    
-    
     def render(self, screen, camera_x, camera_y, zoom, debug=False, show_teleporters=False):
         """
         Rend toutes les tuiles visibles à l'écran en fonction de la position de la caméra et du zoom.
         Si debug=True, dessine des rectangles rouges sur les tuiles bloquantes.
         Si show_teleporters=True, dessine des rectangles bleus sur les zones de téléportation.
         """
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                for x, y, gid in layer:
+        first_x, first_y, last_x, last_y = self.get_visible_tile_range(
+            screen, camera_x, camera_y, zoom
+        )
+
+        # Calques statiques : quelques blits de chunks pré-rendus
+        self.chunk_cache.render(screen, camera_x, camera_y, zoom, first_x, first_y, last_x, last_y)
+        self.blit_count = self.chunk_cache.blit_count
+
+        # Calques dynamiques : dessinés par-dessus les chunks, un seul Surface.blits par calque
+        scaled_tile_width = self.tile_width * zoom
+        scaled_tile_height = self.tile_height * zoom
+        dynamic_layers = self.compute_occlusion()[1]
+        if dynamic_layers:
+            _, tiles = self.get_tile_atlas(zoom)
+        for layer in dynamic_layers:
+            # Accès direct à la grille de gids : on ne parcourt que la partie occupée de la fenêtre visible
+            window = layer.occupancy.clip(first_x, first_y, last_x, last_y)
+            if window is None:
+                continue
+            sequence = []
+            for y in range(window[1], window[3]):
+                row = layer.data[y]
+                draw_y = y * scaled_tile_height - camera_y
+                for x in range(window[0], window[2]):
+                    gid = row[x]
                     if gid != 0:
-                        tile_img = self.get_scaled_tile_image(gid, zoom)
-                        if tile_img:
-                            draw_x = x * self.tile_width * zoom - camera_x
-                            draw_y = y * self.tile_height * zoom - camera_y
-                            screen.blit(tile_img, (draw_x, draw_y))
+                        tile = tiles.get(gid)
+                        if tile:
+                            sequence.append((tile[0], (x * scaled_tile_width - camera_x, draw_y), tile[1]))
+            if sequence:
+                screen.blits(sequence, doreturn=False)
+                self.blit_count += len(sequence)
         if debug:
-            for (x, y) in self.collidable_tiles:
+            for (x, y) in self.collision_grid.blocked_cells():
                 rect = pygame.Rect(
                     x * self.tile_width * zoom - camera_x,
                     y * self.tile_height * zoom - camera_y,
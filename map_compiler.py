@@ -0,0 +1,142 @@
+import os
+import sys
+import glob
+import hashlib
+import struct
+import argparse
+import xml.etree.ElementTree as ET
+import pygame
+import map as m
+import tile_cache as tc
+
+# Dossier contenant les cartes Tiled à compiler par défaut
+TMX_DIRECTORY = "Assets/assets tiled"
+
+
+def list_map_sources(tmx_file, collidable_json):
+    """
+    Liste les fichiers dont dépend une carte : le TMX, le JSON des collisions,
+    les tilesets .tsx référencés et leurs images. Sert à détecter un fichier précompilé périmé.
+    """
+    sources = [tmx_file, collidable_json]
+    tmx_dir = os.path.dirname(tmx_file)
+    root = ET.parse(tmx_file).getroot()
+    for tileset in root.iter("tileset"):
+        tileset_dir = tmx_dir
+        if tileset.get("source"):
+            tsx_file = os.path.join(tmx_dir, tileset.get("source"))
+            sources.append(tsx_file)
+            tileset_dir = os.path.dirname(tsx_file)
+            tileset = ET.parse(tsx_file).getroot()
+        for image in tileset.iter("image"):
+            sources.append(os.path.join(tileset_dir, image.get("source")))
+    return list(dict.fromkeys(os.path.normpath(source) for source in sources))
+
+
+def pack_string(text):
+    """
+    Encode une chaîne en UTF-8 préfixée par sa longueur (uint16).
+    """
+    data = text.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def write_atomic(filename, write):
+    """
+    Écrit un fichier via un fichier temporaire renommé à la fin : un lecteur ne voit jamais
+    de fichier à moitié écrit. write(chemin temporaire) produit le contenu.
+    """
+    root, extension = os.path.splitext(filename)
+    temp_file = f"{root}.tmp{extension}"  # Même extension : pygame.image.save choisit le format d'après elle
+    try:
+        write(temp_file)
+        os.replace(temp_file, filename)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def write_bytes(filename, data):
+    """
+    Écrit data dans filename.
+    """
+    with open(filename, "wb") as f:
+        f.write(data)
+
+
+def compile_map(tmx_file, collidable_json):
+    """
+    Compile un fichier TMX en un fichier binaire .xmap accompagné de son atlas de tuiles PNG.
+    L'atlas est écrit avant le .xmap, et chacun de façon atomique.
+    """
+    game_map = m.Map(tmx_file, collidable_json, use_bundle=False)
+    bundle_file = m.get_bundle_path(tmx_file)
+    bundle_dir = os.path.dirname(bundle_file)
+    atlas_file = os.path.splitext(tmx_file)[0] + ".atlas.png"
+
+    # Renumérotation compacte des gids utilisés (1..N) pour tenir sur 16 bits
+    used_gids = [gid for gid in sorted(game_map.used_gids) if game_map.get_tile_image(gid) is not None]
+    if len(used_gids) > 0xFFFF:
+        raise ValueError(f"{tmx_file} utilise trop de tuiles différentes ({len(used_gids)})")
+    remap = {gid: index for index, gid in enumerate(used_gids, 1)}
+
+    atlas, rects = tc.pack_atlas([game_map.get_tile_image(gid) for gid in used_gids])
+    write_atomic(atlas_file, lambda temp_file: pygame.image.save(atlas, temp_file))
+    with open(atlas_file, "rb") as f:
+        atlas_fingerprint = hashlib.sha1(f.read()).digest()
+
+    sources = list_map_sources(tmx_file, collidable_json)
+
+    data = bytearray(m.BUNDLE_HEADER.pack(
+        m.BUNDLE_MAGIC,
+        m.BUNDLE_VERSION,
+        game_map.map_width,
+        game_map.map_height,
+        game_map.tile_width,
+        game_map.tile_height,
+        len(game_map.tile_layers),
+        len(used_gids),
+        m.fingerprint_sources(sources),
+        atlas_fingerprint
+    ))
+    data += pack_string(os.path.relpath(atlas_file, bundle_dir))
+    data += struct.pack("<H", len(sources))
+    for source in sources:
+        data += pack_string(os.path.relpath(source, bundle_dir))
+    for rect in rects:
+        data += struct.pack("<4H", *rect)
+
+    for layer in game_map.tile_layers:
+        data += pack_string(layer.name)
+        data.append(m.BUNDLE_LAYER_DYNAMIC if layer.properties.get("dynamic", False) else 0)
+        if len(data) % 2:
+            data.append(0)  # Alignement des gids sur 2 octets
+        for row in layer.data:
+            data += struct.pack(f"<{len(row)}H", *(remap.get(gid, 0) for gid in row))
+
+    collision_bits = game_map.collision_grid.to_bitmap()
+    data += struct.pack("<I", len(collision_bits)) + collision_bits
+
+    write_atomic(bundle_file, lambda temp_file: write_bytes(temp_file, data))
+    print(f"[INFO] {tmx_file} compilé : {bundle_file} ({len(data)} octets, {len(used_gids)} tuiles)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précompile les cartes Tiled (.tmx) en fichiers binaires .xmap.")
+    parser.add_argument("tmx_files", nargs="*", help="Cartes à compiler (par défaut toutes celles du dossier des cartes)")
+    parser.add_argument("--collidable", default="collidable_layers.json", help="JSON des calques bloquants")
+    args = parser.parse_args()
+
+    # Pas besoin de fenêtre, mais pytmx a besoin d'un affichage pour convertir les tuiles
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    tmx_files = args.tmx_files or sorted(glob.glob(os.path.join(TMX_DIRECTORY, "*.tmx")))
+    for tmx_file in tmx_files:
+        compile_map(tmx_file, args.collidable)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import threading
+from collections import OrderedDict
+import map as m
+import logger as lg
+
+log = lg.get_logger("map_registry")
+
+# Nombre maximal de cartes gardées en mémoire
+MAP_CACHE_SIZE = 4
+
+
+class MapRegistry:
+    def __init__(self, collidable_json, capacity=MAP_CACHE_SIZE):
+        """
+        Initialise le registre des cartes chargées.
+        Les cartes sont gardées en mémoire (éviction LRU au-delà de capacity cartes)
+        et peuvent être préchargées en arrière-plan par un thread dédié.
+        """
+        self.collidable_json = collidable_json
+        self.capacity = capacity
+        self.maps = OrderedDict()  # fichier TMX -> Map
+        self.current = None  # Carte affichée, jamais évincée (voir set_current)
+        self.preloaded = set()  # Cartes préchargées pas encore visitées, évincées en premier
+        self.loading = set()  # fichiers TMX en cours de chargement
+        self.preload_queue = []  # fichiers TMX à précharger, par ordre de priorité
+        self.requested = []  # fichiers TMX demandés via request(), chargés avant les préchargements
+        self.errors = {}  # fichier TMX -> exception levée par le thread de chargement
+        self.load_count = 0  # Nombre de cartes chargées depuis le disque
+        self.condition = threading.Condition()
+        self.worker = None
+
+    def set_current(self, map_file):
+        """
+        Indique la carte affichée : elle n'est jamais évincée et n'est plus considérée comme préchargée.
+        """
+        with self.condition:
+            self.current = map_file
+            self.mark_visited(map_file)
+
+    def mark_visited(self, map_file):
+        """
+        Place une carte en tête de l'ordre LRU et la retire des cartes préchargées.
+        Doit être appelée avec self.condition acquis.
+        """
+        if map_file in self.maps:
+            self.maps.move_to_end(map_file)
+        self.preloaded.discard(map_file)
+
+    def store(self, map_file, game_map, preloaded=False):
+        """
+        Ajoute une carte au registre et évince au-delà de capacity cartes, en libérant leurs jeux
+        de tuiles partagés : d'abord les cartes préchargées jamais visitées, puis les cartes visitées
+        les moins récemment utilisées. La carte affichée n'est jamais évincée, et une carte préchargée
+        n'évince jamais une carte visitée (elle est abandonnée s'il ne reste pas de place).
+        Doit être appelée avec self.condition acquis.
+        """
+        self.maps[map_file] = game_map
+        self.maps.move_to_end(map_file)
+        if preloaded:
+            self.preloaded.add(map_file)
+        while len(self.maps) > self.capacity:
+            candidates = [f for f in self.maps if f in self.preloaded and f not in (map_file, self.current)]
+            if not candidates:
+                if preloaded:
+                    candidates = [map_file]
+                else:
+                    candidates = [f for f in self.maps if f not in (map_file, self.current)]
+            if not candidates:
+                break
+            old_file = candidates[0]
+            self.preloaded.discard(old_file)
+            self.maps.pop(old_file).close()
+            log.debug("Carte évincée du registre : %s", old_file)
+
+    def load(self, map_file, convert=True, preloaded=False):
+        """
+        Charge une carte depuis le disque puis l'ajoute au registre.
+        convert=False (thread de chargement) : la conversion finale des images est laissée
+        au thread principal (voir Map.finish_loading).
+        preloaded=True : chargement spéculatif, la carte est évincée avant les cartes visitées.
+        """
+        try:
+            game_map = m.Map(map_file, self.collidable_json, convert=convert)
+        except Exception:
+            with self.condition:
+                self.loading.discard(map_file)
+                self.condition.notify_all()
+            raise
+        # Retrait de loading et ajout au registre dans la même section critique : un get() ou
+        # un request() concurrent ne peut pas trouver la carte ni en cours ni chargée
+        with self.condition:
+            self.loading.discard(map_file)
+            self.load_count += 1
+            self.store(map_file, game_map, preloaded and map_file not in self.requested)
+            self.condition.notify_all()
+        return game_map
+
+    def get(self, map_file):
+        """
+        Retourne la carte demandée : depuis le registre si elle est déjà chargée,
+        en attendant le préchargement si elle est en cours, ou en la chargeant sinon.
+        """
+        with self.condition:
+            self.current = map_file
+            self.preloaded.discard(map_file)
+            while map_file in self.loading:
+                self.condition.wait()
+            if map_file in self.maps:
+                self.mark_visited(map_file)
+                game_map = self.maps[map_file]
+                game_map.finish_loading()
+                return game_map
+            self.loading.add(map_file)
+        return self.load(map_file)
+
+    def request(self, map_file):
+        """
+        Version non bloquante de get(), à appeler depuis le thread principal : retourne la carte
+        si elle est chargée, sinon lance son chargement en priorité dans le thread dédié et retourne None.
+        La carte affichée reste celle de set_current() jusqu'au changement effectif de carte.
+        Une erreur survenue pendant le chargement en arrière-plan est relevée ici.
+        """
+        with self.condition:
+            if map_file in self.errors:
+                raise self.errors.pop(map_file)
+            self.preloaded.discard(map_file)
+            if map_file in self.maps:
+                self.mark_visited(map_file)
+                game_map = self.maps[map_file]
+            else:
+                # Une carte en cours de préchargement est aussi notée : elle sera rangée parmi les visitées
+                if map_file not in self.requested:
+                    self.requested.append(map_file)
+                    self.start_worker()
+                    self.condition.notify_all()
+                return None
+        game_map.finish_loading()
+        return game_map
+
+    def start_worker(self):
+        """
+        Démarre le thread de chargement s'il ne tourne pas encore. Doit être appelée avec self.condition acquis.
+        """
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.preload_worker, daemon=True)
+            self.worker.start()
+
+    def preload(self, map_files):
+        """
+        Remplace la file de préchargement par map_files (le premier est chargé en premier)
+        et démarre le thread de préchargement si nécessaire. Le préchargement n'utilise que
+        les places libres du registre ou celles d'anciennes cartes préchargées : il n'évince
+        jamais une carte visitée.
+        """
+        with self.condition:
+            visited = len(self.maps) - len(self.preloaded)
+            free_slots = max(0, self.capacity - visited - len(self.loading))
+            wanted = [f for f in dict.fromkeys(map_files) if f not in self.maps and f not in self.loading]
+            self.preload_queue = wanted[:free_slots]
+            self.start_worker()
+            self.condition.notify_all()
+
+    def preload_worker(self):
+        """
+        Boucle du thread de chargement : charge une par une les cartes demandées puis celles
+        de la file de préchargement (analyse du TMX, collisions et décodage des PNG).
+        """
+        while True:
+            with self.condition:
+                while not self.requested and not self.preload_queue:
+                    self.condition.wait()
+                preloaded = not self.requested
+                queue = self.preload_queue if preloaded else self.requested
+                map_file = queue.pop(0)
+                if map_file in self.maps or map_file in self.loading:
+                    continue
+                self.loading.add(map_file)
+            try:
+                self.load(map_file, convert=False, preloaded=preloaded)
+            except Exception as e:
+                log.error("Chargement impossible de %s: %s", map_file, e)
+                with self.condition:
+                    self.errors[map_file] = e
@@ -0,0 +1,57 @@
+import math
+import numpy as np
+
+
+class LayerOccupancy:
+    def __init__(self, gids, chunk_size):
+        """
+        Calcule, au chargement, l'occupation d'un calque de tuiles à partir de sa grille de gids
+        (tableau NumPy de forme (hauteur, largeur)) : le rectangle englobant des gids non nuls
+        (bornes de fin exclues, None si le calque est vide) et une carte d'occupation par chunk
+        de chunk_size x chunk_size tuiles (1 octet par chunk).
+        """
+        height, width = gids.shape
+        self.chunk_size = chunk_size
+        self.chunks_x = math.ceil(width / chunk_size)
+        self.chunks_y = math.ceil(height / chunk_size)
+        self.bbox = None
+
+        occupied = gids != 0
+        padded = np.zeros((self.chunks_y * chunk_size, self.chunks_x * chunk_size), dtype=bool)
+        padded[:height, :width] = occupied
+        chunks = padded.reshape(self.chunks_y, chunk_size, self.chunks_x, chunk_size).any(axis=(1, 3))
+        self.chunks = bytearray(chunks.astype(np.uint8).tobytes())
+
+        columns = np.flatnonzero(occupied.any(axis=0))
+        rows = np.flatnonzero(occupied.any(axis=1))
+        if rows.size:
+            self.bbox = (int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1)
+
+    def is_empty(self):
+        """
+        Indique si le calque ne contient aucune tuile.
+        """
+        return self.bbox is None
+
+    def chunk_occupied(self, cx, cy):
+        """
+        Indique si le chunk (cx, cy) contient au moins une tuile de ce calque.
+        """
+        if 0 <= cx < self.chunks_x and 0 <= cy < self.chunks_y:
+            return self.chunks[cy * self.chunks_x + cx] != 0
+        return False
+
+    def clip(self, first_x, first_y, last_x, last_y):
+        """
+        Restreint une fenêtre de tuiles (bornes de fin exclues) au rectangle occupé par le calque.
+        Retourne la fenêtre réduite, ou None si elle ne contient aucune tuile du calque.
+        """
+        if self.bbox is None:
+            return None
+        first_x = max(first_x, self.bbox[0])
+        first_y = max(first_y, self.bbox[1])
+        last_x = min(last_x, self.bbox[2])
+        last_y = min(last_y, self.bbox[3])
+        if first_x >= last_x or first_y >= last_y:
+            return None
+        return first_x, first_y, last_x, last_y
@@ -0,0 +1,191 @@
+import array
+import heapq
+from collections import deque, OrderedDict
+import logger as lg
+
+log = lg.get_logger("pathfinding")
+
+# Nombre de champs de distance gardés en cache par carte (portes, points d'arrivée...)
+FIELD_CACHE_SIZE = 16
+
+
+class Pathfinder:
+    def __init__(self, collision_grid, components=None):
+        """
+        Initialise la recherche de chemins sur la grille de collision d'une carte (4-connexité,
+        comme les déplacements du joueur). components (numéros de composante connexe par case,
+        voir SpawnResolver) permet de rejeter immédiatement les buts inaccessibles.
+        Les champs de distance vers les cibles fréquentes (portes, points d'arrivée) sont gardés
+        en cache (LRU) : un par ensemble de cases cibles, partagé par tous les agents qui s'y rendent
+        (PNJ, déplacement au clic vers une porte). Le cache vit avec la carte : il repart de zéro
+        à chaque chargement.
+        """
+        self.width = collision_grid.width
+        self.height = collision_grid.height
+        self.cells = collision_grid.cells
+        self.components = components
+        self.fields = OrderedDict()  # (cases cibles, cases évitées) -> distance par case (-1 : inaccessible)
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """
+        Vide le cache des champs de distance.
+        """
+        self.fields.clear()
+
+    def is_free(self, x, y):
+        """
+        Indique si la case (x, y) est dans la carte et libre.
+        """
+        return 0 <= x < self.width and 0 <= y < self.height and not self.cells[y * self.width + x]
+
+    def get_neighbours(self, index):
+        """
+        Itère sur les cases libres voisines (indices dans la grille) d'une case.
+        """
+        width = self.width
+        cells = self.cells
+        x = index % width
+        if x > 0 and not cells[index - 1]:
+            yield index - 1
+        if x < width - 1 and not cells[index + 1]:
+            yield index + 1
+        if index >= width and not cells[index - width]:
+            yield index - width
+        if index + width < len(cells) and not cells[index + width]:
+            yield index + width
+
+    def get_field(self, targets, avoid=()):
+        """
+        Retourne le champ de distance (en cases) vers l'ensemble de cases targets, calculé une seule fois
+        par un parcours en largeur depuis toutes les cibles libres à la fois (Dijkstra à coût uniforme).
+        Les cases de avoid (ex. les autres portes) ne sont jamais traversées : leur distance reste -1.
+        """
+        goals = frozenset((x, y) for x, y in targets if self.is_free(x, y))
+        key = (goals, frozenset(avoid) - goals)
+        field = self.fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        width = self.width
+        cells = self.cells
+        size = len(cells)
+        field = array.array("i", [-1]) * size
+        avoided = bytearray(size)
+        for x, y in key[1]:
+            if 0 <= x < width and 0 <= y < self.height:
+                avoided[y * width + x] = 1
+        queue = deque()
+        for x, y in goals:
+            field[y * width + x] = 0
+            queue.append(y * width + x)
+        while queue:
+            index = queue.popleft()
+            distance = field[index] + 1
+            x = index % width
+            for neighbour, valid in ((index - 1, x > 0), (index + 1, x < width - 1),
+                                     (index - width, index >= width), (index + width, index + width < size)):
+                if valid and field[neighbour] == -1 and not cells[neighbour] and not avoided[neighbour]:
+                    field[neighbour] = distance
+                    queue.append(neighbour)
+
+        self.fields[key] = field
+        if len(self.fields) > FIELD_CACHE_SIZE:
+            self.fields.popitem(last=False)
+        log.debug("Champ de distance calculé vers %s case(s)", len(goals))
+        return field
+
+    def get_distance(self, x, y, targets, avoid=()):
+        """
+        Retourne la distance (en cases) de (x, y) à la cible la plus proche, ou None si elle est inaccessible.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        distance = self.get_field(targets, avoid)[y * self.width + x]
+        return distance if distance >= 0 else None
+
+    def next_step(self, x, y, targets, avoid=()):
+        """
+        Retourne la case voisine de (x, y) qui rapproche le plus des cibles, ou None si (x, y)
+        est déjà une cible ou ne permet pas de les atteindre. Une simple lecture du champ en cache.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        field = self.get_field(targets, avoid)
+        index = y * self.width + x
+        best = field[index]
+        if best <= 0:
+            return None
+        step = None
+        for neighbour in self.get_neighbours(index):
+            if 0 <= field[neighbour] < best:
+                best = field[neighbour]
+                step = neighbour
+        return (step % self.width, step // self.width) if step is not None else None
+
+    def find_path(self, start_x, start_y, goal_x, goal_y, avoid=()):
+        """
+        Cherche un plus court chemin de (start_x, start_y) à (goal_x, goal_y) par A* (heuristique de
+        Manhattan). Les cases de avoid (ex. zones de téléportation) ne sont traversées que si elles
+        sont le but. Retourne la liste des cases à parcourir, départ exclu et but inclus ([] si le départ
+        est le but), ou None s'il n'existe pas de chemin. Vers une cible fréquente (porte), préférer
+        follow_field, qui lit le chemin dans son champ de distance en cache.
+        """
+        width = self.width
+        if not self.is_free(goal_x, goal_y) or not (0 <= start_x < width and 0 <= start_y < self.height):
+            return None
+        start = start_y * width + start_x
+        goal = goal_y * width + goal_x
+        if self.components is not None and self.components[start] != self.components[goal]:
+            return None  # Composantes différentes : inutile de chercher
+
+        avoided = {y * width + x for x, y in avoid} - {goal}
+
+        cells = self.cells
+        size = len(cells)
+        g_score = array.array("i", [-1]) * size
+        came_from = array.array("i", [-1]) * size
+        g_score[start] = 0
+        # (f, -g, case) : à f égal, on développe d'abord les cases les plus proches du but
+        open_heap = [(abs(start_x - goal_x) + abs(start_y - goal_y), 0, start)]
+        while open_heap:
+            _, negative_g, index = heapq.heappop(open_heap)
+            if index == goal:
+                path = []
+                while index != start:
+                    path.append((index % width, index // width))
+                    index = came_from[index]
+                path.reverse()
+                return path
+            g = -negative_g
+            if g > g_score[index]:
+                continue  # Entrée périmée
+            tentative = g + 1
+            x = index % width
+            for neighbour, valid in ((index - 1, x > 0), (index + 1, x < width - 1),
+                                     (index - width, index >= width), (index + width, index + width < size)):
+                if valid and not cells[neighbour] and (g_score[neighbour] == -1 or tentative < g_score[neighbour]) \
+                        and neighbour not in avoided:
+                    g_score[neighbour] = tentative
+                    came_from[neighbour] = index
+                    h = abs(neighbour % width - goal_x) + abs(neighbour // width - goal_y)
+                    heapq.heappush(open_heap, (tentative + h, -tentative, neighbour))
+        return None
+
+    def follow_field(self, x, y, targets, avoid=()):
+        """
+        Construit le chemin de (x, y) vers les cibles en descendant leur champ de distance
+        (départ exclu, cible atteinte incluse). Retourne None si les cibles sont inaccessibles depuis (x, y).
+        """
+        if self.get_distance(x, y, targets, avoid) is None:
+            return None
+        path = []
+        step = self.next_step(x, y, targets, avoid)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(*step, targets, avoid)
+        return path
@@ -1,99 +1,110 @@
-import pygame
-import time
+import entities as en
+
+
+def entity_field(name, convert):
+    """
+    Propriété du joueur lue et écrite dans le champ name de son entité (voir EntityStore).
+    """
+    def get(self):
+        return convert(getattr(self.store, name)[self.entity])
+
+    def set(self, value):
+        getattr(self.store, name)[self.entity] = value
+
+    return property(get, set)
+
 
 class Player:
-    def __init__(self, animations, spawn_x, spawn_y, tile_width, tile_height, zoom, sprite_scale):
+    def __init__(self, animations, spawn_x, spawn_y, tile_width, tile_height, zoom, sprite_scale, store=None):
         """
         Initialise le joueur avec les animations, la position de spawn, et les paramètres de zoom et d'échelle.
+        Le joueur est une entité du stockage store (créé s'il n'est pas fourni) : son état de déplacement
+        et d'animation vit dans les tableaux partagés avec les PNJ, et ses cadres dans leurs atlas.
         """
+        self.store = store or en.EntityStore(tile_width, tile_height, zoom)
+        self.store.set_zoom(zoom)
         self.animations = animations
-        self.direction = "down"
-        self.position_x = spawn_x
-        self.position_y = spawn_y
-        self.zoom = zoom
         self.sprite_scale = sprite_scale
-        self.tile_width = tile_width
-        self.tile_height = tile_height
-
-        # Initialiser les attributs de mouvement avant d'appeler get_current_frame
-        self.is_moving = False
-        self.move_start_x = 0.0
-        self.move_start_y = 0.0
-        self.move_target_x = 0.0
-        self.move_target_y = 0.0
-        self.move_start_time = 0
-        self.move_duration = 0.1
-        self.anim_speed = 0.3
+        self.entity = self.store.add(spawn_x, spawn_y, self.store.add_sprite(animations, sprite_scale),
+                                     move_duration=0.1, anim_speed=0.3)
 
         self.scaled_player_image = self.get_current_frame()
 
-    def get_current_frame(self):
+    position_x = entity_field("position_x", float)
+    position_y = entity_field("position_y", float)
+    previous_x = entity_field("previous_x", float)
+    previous_y = entity_field("previous_y", float)
+    move_start_x = entity_field("move_start_x", float)
+    move_start_y = entity_field("move_start_y", float)
+    move_target_x = entity_field("move_target_x", float)
+    move_target_y = entity_field("move_target_y", float)
+    move_elapsed = entity_field("move_elapsed", float)
+    move_duration = entity_field("move_duration", float)
+    anim_speed = entity_field("anim_speed", float)
+    is_moving = entity_field("is_moving", bool)
+
+    @property
+    def direction(self):
+        return en.DIRECTIONS[self.store.direction[self.entity]]
+
+    @direction.setter
+    def direction(self, direction):
+        self.store.direction[self.entity] = en.DIRECTION_CODES[direction]
+
+    @property
+    def zoom(self):
+        return self.store.zoom
+
+    @property
+    def tile_width(self):
+        return self.store.tile_width
+
+    @property
+    def tile_height(self):
+        return self.store.tile_height
+
+    def set_zoom(self, zoom):
         """
-        Obtient le cadre actuel de l'animation en fonction de la direction et du temps.
+        Met à jour le zoom du joueur (et des autres entités) ; les cadres ne sont reconstruits que si le zoom change.
         """
-        frames = self.animations[self.direction]
-        nb_frames = len(frames)
-        current_frame = frames[0]  # Par défaut, le premier cadre
+        self.store.set_zoom(zoom)
 
-        if self.is_moving:
-            elapsed = time.time() - self.move_start_time
-            ratio = elapsed / self.move_duration
-            anim_progress = ratio * self.anim_speed
-            frame_index = int(anim_progress * nb_frames)
-            if frame_index >= nb_frames:
-                frame_index = nb_frames - 1
-            current_frame = frames[frame_index]
-
-        # Redimensionner l'image du joueur
-        scaled_width = int(self.tile_width * self.zoom * self.sprite_scale)
-        scaled_height = int(self.tile_height * self.zoom * self.sprite_scale)
-        return pygame.transform.scale(current_frame, (scaled_width, scaled_height))
+    def get_current_frame(self):
+        """
+        Obtient le cadre actuel de l'animation (déjà mis à l'échelle) en fonction de la direction et du temps.
+        """
+        return self.store.get_frame(self.entity)
 
     def start_move(self, direction):
         """
         Démarre un déplacement dans une direction donnée.
         """
-        if not self.is_moving:
-            self.direction = direction
-            self.is_moving = True
-            self.move_start_time = time.time()
-            self.move_start_x = self.position_x
-            self.move_start_y = self.position_y
-            if direction == "left":
-                self.move_target_x = self.position_x - 1
-                self.move_target_y = self.position_y
-            elif direction == "right":
-                self.move_target_x = self.position_x + 1
-                self.move_target_y = self.position_y
-            elif direction == "up":
-                self.move_target_x = self.position_x
-                self.move_target_y = self.position_y - 1
-            elif direction == "down":
-                self.move_target_x = self.position_x
-                self.move_target_y = self.position_y + 1
-
-    def update_position(self):
-        """
-        Met à jour la position du joueur en fonction du temps pour l'interpolation.
-        """
-        if self.is_moving:
-            elapsed = time.time() - self.move_start_time
-            if elapsed >= self.move_duration:
-                self.position_x = self.move_target_x
-                self.position_y = self.move_target_y
-                self.is_moving = False
-            else:
-                ratio = elapsed / self.move_duration
-                self.position_x = self.move_start_x + ratio * (self.move_target_x - self.move_start_x)
-                self.position_y = self.move_start_y + ratio * (self.move_target_y - self.move_start_y)
-
-    def render(self, screen, camera_x, camera_y):
-        """
-        Rends le joueur à l'écran.
+        self.store.start_move(self.entity, direction)
+
+    def reset_position(self, x, y):
+        """
+        Place le joueur directement en (x, y) (spawn, téléportation), en annulant tout déplacement en cours.
         """
-        self.scaled_player_image = self.get_current_frame()
-        player_px = self.position_x * self.tile_width * self.zoom
-        player_py = self.position_y * self.tile_height * self.zoom
+        self.store.reset_position(self.entity, x, y)
+
+    def get_render_position(self, alpha=1.0):
+        """
+        Retourne la position à afficher, interpolée entre le tick précédent (alpha=0) et le tick courant (alpha=1).
+        """
+        if alpha >= 1.0:
+            return self.position_x, self.position_y
+        return (
+            self.previous_x + alpha * (self.position_x - self.previous_x),
+            self.previous_y + alpha * (self.position_y - self.previous_y)
+        )
+
+    def get_draw_position(self, camera_x, camera_y, alpha=1.0):
+        """
+        Retourne la position à l'écran du coin supérieur gauche du sprite courant.
+        """
+        position_x, position_y = self.get_render_position(alpha)
+        player_px = position_x * self.tile_width * self.zoom
+        player_py = position_y * self.tile_height * self.zoom
 
         draw_x = player_px - camera_x
         draw_y = player_py - camera_y
@@ -102,4 +113,11 @@ class Player:
         draw_x -= (self.scaled_player_image.get_width() - self.tile_width * self.zoom) / 2
         # draw_y -= (self.scaled_player_image.get_height() - self.tile_height * self.zoom) / 2  # Décommentez si besoin
 
-        screen.blit(self.scaled_player_image, (draw_x, draw_y))
\ No newline at end of file
+        return draw_x, draw_y
+
+    def render(self, screen, camera_x, camera_y, alpha=1.0):
+        """
+        Rends le joueur à l'écran, à sa position interpolée. Retourne le rectangle modifié.
+        """
+        self.scaled_player_image = self.get_current_frame()
+        return screen.blit(self.scaled_player_image, self.get_draw_position(camera_x, camera_y, alpha))
@@ -0,0 +1,125 @@
+import csv
+import time
+import contextlib
+from collections import deque
+import pygame
+
+# Nombre de frames gardées dans l'historique circulaire (10 secondes à 60 images par seconde)
+PROFILE_HISTORY_SIZE = 600
+
+# Nombre de frames moyennées pour l'affichage à l'écran
+OVERLAY_AVERAGE_FRAMES = 60
+
+
+class Profiler:
+    def __init__(self, history_size=PROFILE_HISTORY_SIZE):
+        """
+        Initialise l'instrumentation du jeu : des minuteurs (durées cumulées par frame, en ms),
+        des compteurs et des jauges. Chaque frame terminée (end_frame) est ajoutée à un historique
+        circulaire qui peut être affiché à l'écran (render_overlay) ou exporté en CSV (dump_csv).
+        """
+        self.history = deque(maxlen=history_size)
+        self.current = {}
+        self.columns = {"frame": None, "frame_ms": None}  # Colonnes du CSV, dans l'ordre d'apparition
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+        self.font = None
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """
+        Mesure la durée du bloc (with profiler.measure("update"): ...) et l'ajoute au minuteur name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """
+        Ajoute une durée (en secondes) au minuteur name de la frame courante.
+        """
+        key = name + "_ms"
+        self.current[key] = self.current.get(key, 0.0) + seconds * 1000
+        self.columns.setdefault(key, None)
+
+    def count(self, name, amount=1):
+        """
+        Incrémente le compteur name de la frame courante.
+        """
+        self.current[name] = self.current.get(name, 0) + amount
+        self.columns.setdefault(name, None)
+
+    def gauge(self, name, value):
+        """
+        Enregistre la valeur instantanée name (ex. total de succès d'un cache) pour la frame courante.
+        """
+        self.current[name] = value
+        self.columns.setdefault(name, None)
+
+    def end_frame(self):
+        """
+        Termine la frame courante : calcule sa durée totale et l'ajoute à l'historique.
+        """
+        now = time.perf_counter()
+        self.current["frame"] = self.frame
+        self.current["frame_ms"] = (now - self.frame_start) * 1000
+        self.history.append(self.current)
+        self.current = {}
+        self.frame += 1
+        self.frame_start = now
+
+    def averages(self, frames=OVERLAY_AVERAGE_FRAMES):
+        """
+        Retourne {colonne: moyenne} sur les dernières frames de l'historique, et le maximum de frame_ms.
+        """
+        recent = list(self.history)[-frames:]
+        if not recent:
+            return {}, 0.0
+        totals = {}
+        for entry in recent:
+            for key, value in entry.items():
+                totals[key] = totals.get(key, 0) + value
+        return {key: value / len(recent) for key, value in totals.items()}, max(entry["frame_ms"] for entry in recent)
+
+    def dump_csv(self, filename):
+        """
+        Écrit l'historique dans un fichier CSV (une ligne par frame, une colonne par mesure).
+        """
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.columns), restval="")
+            writer.writeheader()
+            writer.writerows(self.history)
+        return len(self.history)
+
+    def render_overlay(self, screen, lines=()):
+        """
+        Affiche en haut à gauche de l'écran la moyenne des mesures sur les dernières frames,
+        suivie des lignes supplémentaires fournies. Retourne le rectangle dessiné.
+        """
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+
+        average, worst = self.averages()
+        frame_ms = average.get("frame_ms", 0.0)
+        text = [f"frame {frame_ms:.2f} ms (max {worst:.2f}) - {1000 / frame_ms if frame_ms else 0:.0f} fps"]
+        for key, value in average.items():
+            if key.endswith("_ms") and key != "frame_ms":
+                text.append(f"{key[:-3]} {value:.3f} ms")
+            elif key not in ("frame", "frame_ms"):
+                text.append(f"{key} {value:.1f}")
+        text.extend(lines)
+
+        images = [self.font.render(line, True, (255, 255, 255)) for line in text]
+        width = max(image.get_width() for image in images) + 8
+        height = sum(image.get_height() for image in images) + 8
+        background = pygame.Surface((width, height))
+        background.set_alpha(180)
+        screen.blit(background, (0, 0))
+        y = 4
+        for image in images:
+            screen.blit(image, (4, y))
+            y += image.get_height()
+        return pygame.Rect(0, 0, width, height)
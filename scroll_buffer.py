@@ -0,0 +1,70 @@
+import math
+import pygame
+
+
+class ScrollBuffer:
+    def __init__(self):
+        """
+        Initialise le tampon de défilement : une surface hors écran de la taille de la vue qui garde
+        la carte déjà composée. Quand la caméra bouge, les pixels existants sont décalés
+        (Surface.scroll) et seules les bandes découvertes sont redessinées.
+        """
+        self.surface = None
+        self.view = None  # (carte, zoom, taille) de la composition courante
+        self.origin_x = 0  # Position entière de la caméra correspondant au coin du tampon
+        self.origin_y = 0
+        self.blit_count = 0  # Nombre de blits de la dernière mise à jour
+
+    def redraw(self, game_map, rect, zoom):
+        """
+        Redessine la carte dans la zone rect du tampon.
+        """
+        self.surface.set_clip(rect)
+        self.surface.fill((0, 0, 0), rect)
+        game_map.render(self.surface, self.origin_x, self.origin_y, zoom)
+        self.surface.set_clip(None)
+        self.blit_count += game_map.blit_count
+
+    def update(self, game_map, screen, camera_x, camera_y, zoom):
+        """
+        Met le tampon à jour pour la caméra donnée et le retourne.
+        Même carte et même zoom : décalage des pixels puis redessin des seules bandes découvertes
+        (coût proportionnel au bord de l'écran) ; sinon recomposition complète.
+        Si la taille des tuiles à l'écran n'est pas un nombre entier de pixels (zoom fractionnaire),
+        leurs positions ne sont pas entières et leur arrondi dépend de la caméra : les pixels décalés
+        ne correspondraient plus à un redessin complet, la carte est donc recomposée dès que la caméra bouge.
+        """
+        size = screen.get_size()
+        view = (game_map, zoom, size)
+        origin_x = math.floor(camera_x)
+        origin_y = math.floor(camera_y)
+        dx = origin_x - self.origin_x
+        dy = origin_y - self.origin_y
+        width, height = size
+        self.blit_count = 0
+
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size).convert(screen)
+            self.view = None
+
+        if view == self.view and dx == 0 and dy == 0:
+            return self.surface  # Caméra immobile : le tampon est déjà à jour, quel que soit le zoom
+
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        scrollable = float(game_map.tile_width * zoom).is_integer() and float(game_map.tile_height * zoom).is_integer()
+        if view != self.view or not scrollable or abs(dx) >= width or abs(dy) >= height:
+            self.view = view
+            self.redraw(game_map, self.surface.get_rect(), zoom)
+            return self.surface
+
+        self.surface.scroll(-dx, -dy)
+        if dx > 0:
+            self.redraw(game_map, pygame.Rect(width - dx, 0, dx, height), zoom)
+        elif dx < 0:
+            self.redraw(game_map, pygame.Rect(0, 0, -dx, height), zoom)
+        if dy > 0:
+            self.redraw(game_map, pygame.Rect(0, height - dy, width, dy), zoom)
+        elif dy < 0:
+            self.redraw(game_map, pygame.Rect(0, 0, width, -dy), zoom)
+        return self.surface
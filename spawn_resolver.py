@@ -0,0 +1,118 @@
+import array
+from collections import deque
+import numpy as np
+import logger as lg
+
+log = lg.get_logger("spawn_resolver")
+
+# Voisins d'une case (4-connexité : les déplacements du joueur se font case par case, sans diagonale)
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class SpawnResolver:
+    def __init__(self, collision_grid):
+        """
+        Précalcule, une fois par carte, l'index des cases libres de la grille de collision :
+        le numéro de composante connexe de chaque case libre (-1 pour une case bloquante)
+        et la taille de chaque composante.
+        """
+        self.width = collision_grid.width
+        self.height = collision_grid.height
+        self.labels, self.sizes = self.label_components(collision_grid.cells)
+
+    def label_components(self, cells):
+        """
+        Numérote les composantes connexes des cases libres, numérotées dans l'ordre de leur première case
+        (ligne par ligne). Les segments horizontaux de cases libres sont extraits avec NumPy, puis les
+        segments qui se touchent d'une ligne à la suivante sont fusionnés, sans boucle Python par case.
+        Retourne (numéro par case, taille par composante).
+        """
+        free = np.frombuffer(cells, dtype=np.uint8).reshape(self.height, self.width) == 0
+        # Début de segment : case libre dont la voisine de gauche (sur la même ligne) est bloquante
+        starts = free.copy()
+        starts[:, 1:] &= ~free[:, :-1]
+        runs = np.cumsum(starts.ravel()).reshape(free.shape) - 1  # Numéro de segment de chaque case libre
+        run_count = int(starts.sum())
+
+        # Paires de segments reliés verticalement (une case libre au-dessus d'une case libre)
+        linked = free[:-1] & free[1:]
+        pairs = np.unique(runs[:-1][linked] * run_count + runs[1:][linked])
+        uppers, lowers = np.divmod(pairs, run_count) if run_count else (pairs, pairs)
+
+        # Chaque racine reliée à une racine plus petite s'y rattache, puis les chemins sont compressés,
+        # jusqu'à stabilité : chaque composante finit rattachée à son premier segment
+        roots = np.arange(run_count)
+        while True:
+            upper_roots, lower_roots = roots[uppers], roots[lowers]
+            split = upper_roots != lower_roots
+            if not split.any():
+                break
+            np.minimum.at(roots, np.maximum(upper_roots, lower_roots)[split], np.minimum(upper_roots, lower_roots)[split])
+            while True:
+                jumped = roots[roots]
+                if np.array_equal(jumped, roots):
+                    break
+                roots = jumped
+
+        # Racines renumérotées 0..n-1 dans l'ordre de leur premier segment (donc de leur première case)
+        unique_roots, run_labels = np.unique(roots, return_inverse=True)
+        labels = np.full(free.size, -1, dtype=np.int32)
+        labels[free.ravel()] = run_labels[runs[free]]
+        sizes = np.bincount(labels[labels >= 0], minlength=len(unique_roots)).tolist()
+        log.debug("%s composantes libres (plus grande : %s cases)", len(sizes), max(sizes, default=0))
+        return array.array("i", labels.tobytes()), sizes
+
+    def get_component(self, x, y):
+        """
+        Retourne le numéro de composante de la case (x, y), ou -1 si elle est bloquante ou hors de la carte.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.labels[y * self.width + x]
+        return -1
+
+    def get_allowed_components(self, entry_points):
+        """
+        Retourne l'ensemble des composantes atteignables depuis les points d'entrée de la carte
+        (portes, arrivées de téléporteurs). Sans point d'entrée libre, seule la plus grande
+        composante est retenue.
+        """
+        allowed = {self.get_component(x, y) for x, y in entry_points}
+        allowed.discard(-1)
+        if not allowed and self.sizes:
+            allowed.add(max(range(len(self.sizes)), key=self.sizes.__getitem__))
+        return allowed
+
+    def resolve(self, preferred_x, preferred_y, entry_points=(), max_distance=None):
+        """
+        Retourne la case libre la plus proche (distance de Manhattan) de la case préférée, parmi
+        les composantes atteignables depuis entry_points : parcours en largeur borné à max_distance
+        cases (par défaut toute la carte), d'un coût proportionnel à la zone explorée.
+        Retourne None si aucune case ne convient.
+        """
+        width = self.width
+        height = self.height
+        allowed = self.get_allowed_components(entry_points)
+        if not allowed:
+            return None
+
+        # Une case préférée hors de la carte est ramenée sur son bord le plus proche
+        start_x = min(max(int(preferred_x), 0), width - 1)
+        start_y = min(max(int(preferred_y), 0), height - 1)
+        if max_distance is None:
+            max_distance = width + height
+
+        visited = {(start_x, start_y)}
+        queue = deque([(start_x, start_y, 0)])
+        while queue:
+            x, y, distance = queue.popleft()
+            if self.labels[y * width + x] in allowed:
+                return x, y
+            if distance == max_distance:
+                continue
+            for dx, dy in NEIGHBOURS:
+                nx = x + dx
+                ny = y + dy
+                if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in visited:
+                    visited.add((nx, ny))
+                    queue.append((nx, ny, distance + 1))
+        return None
@@ -1,43 +1,110 @@
 import json
-import map as m
+import logger as lg
+
+log = lg.get_logger("teleport")
 
 class Teleporter:
-    def __init__(self, json_file):
+    def __init__(self, json_file, registry):
         """
         Initialise les téléporteurs en chargeant les données à partir d'un fichier JSON.
+        Les cartes de destination sont obtenues via le registre de cartes (cache + préchargement).
         """
+        self.registry = registry
         self.teleport_zones = self.load_teleport_zones(json_file)
+        self.zone_index = self.build_zone_index(self.teleport_zones)
 
     def load_teleport_zones(self, json_file):
         """
         Charge les zones de téléportation à partir d'un fichier JSON.
+        Retourne un dictionnaire carte -> liste de zones. Le fichier peut être organisé par carte
+        ({"carte.tmx": [zones]}) ou être une liste globale ({"zones": [zones]}) : ces zones-là
+        sont rangées sous la clé None et valent pour toutes les cartes.
         """
         with open(json_file, "r", encoding="utf-8") as f:
             data = json.load(f)
 
-        teleport_zones = []
-        for zone in data["zones"]:
-            coordinates = [tuple(coord) for coord in zone["coordinates"]]
-            teleport_zones.append({
-                "coordinates": coordinates,
-                "target_map": zone["target_map"],
-                "spawn_position": tuple(zone["spawn_position"])
-            })
+        if "zones" in data:
+            data = {None: data["zones"]}
+
+        teleport_zones = {}
+        for map_file, zones in data.items():
+            teleport_zones[map_file] = []
+            for zone in zones:
+                coordinates = [tuple(coord) for coord in zone["coordinates"]]
+                teleport_zones[map_file].append({
+                    "coordinates": coordinates,
+                    "target_map": zone["target_map"],
+                    "spawn_position": tuple(zone["spawn_position"])
+                })
 
         return teleport_zones
 
-    def check_teleportation(self, player):
+    def build_zone_index(self, teleport_zones):
+        """
+        Compile les zones en un index par carte : carte -> {(x, y): zone}.
+        Une vérification ne coûte alors qu'une recherche dans un dictionnaire.
+        """
+        zone_index = {}
+        for map_file, zones in teleport_zones.items():
+            tiles = zone_index[map_file] = {}
+            for zone in zones:
+                for coord in zone["coordinates"]:
+                    tiles.setdefault(coord, zone)  # La première zone déclarée est prioritaire
+        return zone_index
+
+    def get_zones(self, map_file):
         """
-        Vérifie si le joueur est dans une zone de téléportation et retourne la nouvelle carte et position.
+        Retourne les zones de téléportation actives sur une carte.
+        """
+        return self.teleport_zones.get(map_file, []) + self.teleport_zones.get(None, [])
+
+    def get_entry_points(self, map_file):
+        """
+        Retourne les cases par lesquelles le joueur peut entrer sur une carte : les cases des zones
+        de téléportation de la carte (portes) et les positions d'arrivée des zones qui y mènent.
+        """
+        entry_points = [coord for zone in self.get_zones(map_file) for coord in zone["coordinates"]]
+        return entry_points + self.get_arrival_points(map_file)
+
+    def get_arrival_points(self, map_file):
+        """
+        Retourne les positions d'arrivée (sans doublon) des zones de téléportation qui mènent à une carte.
+        """
+        arrival_points = []
+        for zones in self.teleport_zones.values():
+            for zone in zones:
+                if zone["target_map"] == map_file and zone["spawn_position"] not in arrival_points:
+                    arrival_points.append(zone["spawn_position"])
+        return arrival_points
+
+    def preload_destinations(self, player, map_file):
+        """
+        Précharge en arrière-plan les cartes de destination de la carte courante, en commençant par
+        celles des zones les plus proches du joueur.
+        """
+        def distance(zone):
+            return min(
+                abs(x - player.position_x) + abs(y - player.position_y)
+                for x, y in zone["coordinates"]
+            )
+
+        zones = sorted(self.get_zones(map_file), key=distance)
+        self.registry.preload([zone["target_map"] for zone in zones])
+
+    def check_teleportation(self, player, map_file):
+        """
+        Vérifie si le joueur est dans une zone de téléportation de la carte courante et retourne
+        (fichier de la carte de destination, position d'arrivée), ou (None, None).
+        Le chargement de la destination est lancé en arrière-plan s'il n'est pas déjà fait.
         """
         player_coords = (int(player.position_x), int(player.position_y))
 
-        for zone in self.teleport_zones:
-            if player_coords in zone["coordinates"]:
-                print(f"[INFO] Téléportation déclenchée vers {zone['target_map']} aux coordonnées {zone['spawn_position']}")
-                new_map = m.Map(zone["target_map"], "collidable_layers.json")
-                new_position = zone["spawn_position"]
-                return new_map, new_position
+        zone = self.zone_index.get(map_file, {}).get(player_coords)
+        if zone is None:
+            zone = self.zone_index.get(None, {}).get(player_coords)
+        if zone is not None:
+            log.info("Téléportation déclenchée vers %s aux coordonnées %s", zone["target_map"], zone["spawn_position"])
+            self.registry.request(zone["target_map"])
+            return zone["target_map"], zone["spawn_position"]
 
         return None, None
-
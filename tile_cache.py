@@ -0,0 +1,220 @@
+import math
+import pygame
+import threading
+from collections import OrderedDict
+import logger as lg
+
+log = lg.get_logger("tile_cache")
+
+# Pas entre deux niveaux de zoom (les zooms sont arrondis à ce pas)
+ZOOM_STEP = 0.1
+
+# Budget mémoire par défaut pour l'ensemble des niveaux de zoom (en octets)
+TILE_CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+def quantize_zoom(zoom):
+    """
+    Arrondit un zoom au niveau discret le plus proche, pour que 4.1000000001 et 4.1 partagent le même cache.
+    """
+    return round(round(zoom / ZOOM_STEP) * ZOOM_STEP, 6)
+
+
+def pack_atlas(images, flags=pygame.SRCALPHA):
+    """
+    Range des images dans une grille carrée et retourne (atlas, rectangles).
+    flags=0 crée un atlas sans canal alpha, pour des tuiles opaques copiées sans mélange.
+    """
+    cell_width = max((image.get_width() for image in images), default=1)
+    cell_height = max((image.get_height() for image in images), default=1)
+    columns = max(1, math.ceil(math.sqrt(len(images))))
+    rows = max(1, math.ceil(len(images) / columns))
+
+    atlas = pygame.Surface((columns * cell_width, rows * cell_height), flags)
+    rects = []
+    for index, image in enumerate(images):
+        x = (index % columns) * cell_width
+        y = (index // columns) * cell_height
+        atlas.blit(image, (x, y))
+        rects.append((x, y, image.get_width(), image.get_height()))
+    return atlas, rects
+
+
+class TileCache:
+    def __init__(self, game_map, budget_bytes=TILE_CACHE_BUDGET_BYTES, background=True):
+        """
+        Initialise le cache des tuiles mises à l'échelle, organisé par niveau de zoom.
+        Chaque niveau est un atlas : deux surfaces contenant toutes les tuiles utilisées par la carte
+        (tuiles avec transparence, tuiles opaques sans canal alpha), et pour chaque gid la surface
+        et le rectangle où il se trouve (pour les blits groupés via Surface.blits).
+        Plusieurs niveaux restent en mémoire et sont évincés (LRU) selon leur taille en octets.
+        Si background=True, prepare() construit un nouveau niveau dans un thread pendant que
+        l'ancien niveau continue d'être affiché.
+        """
+        self.map = game_map
+        self.budget_bytes = budget_bytes
+        self.background = background
+        self.levels = OrderedDict()  # zoom -> ((atlas alpha, atlas opaque), {gid: (atlas source, rectangle dans cet atlas)})
+        self.level_bytes = {}  # zoom -> taille en octets du niveau
+        self.used_bytes = 0
+        self.display_zoom = None  # Dernier niveau de zoom prêt à être affiché
+        self.pending = {}  # zoom -> thread de construction en cours
+        self.finished = {}  # zoom -> (atlas, chunks) construits par un thread, pas encore publiés
+        self.errors = {}  # zoom -> exception levée par le thread de construction, pas encore publiée
+        self.lock = threading.Lock()
+        self.level_hits = 0  # Recherches d'un niveau déjà construit (construction d'un chunk, calques dynamiques)
+        self.level_misses = 0  # Niveaux construits dans le thread principal
+
+    def clear(self):
+        """
+        Vide entièrement le cache (les constructions en cours seront ignorées).
+        """
+        with self.lock:
+            self.levels.clear()
+            self.level_bytes.clear()
+            self.finished.clear()
+            self.used_bytes = 0
+
+    def scale_tile(self, gid, zoom):
+        """
+        Redimensionne l'image originale d'une tuile au zoom donné.
+        """
+        return self.map.scale_tile_image(gid, (int(self.map.tile_width * zoom), int(self.map.tile_height * zoom)))
+
+    def get_level(self, zoom):
+        """
+        Récupère les atlas ((atlas alpha, atlas opaque), {gid: (atlas source, rectangle)}) d'un niveau de zoom, en le construisant s'il n'est pas en cache.
+        """
+        zoom = quantize_zoom(zoom)
+        level = self.levels.get(zoom)
+        if level is not None:
+            self.level_hits += 1
+            self.levels.move_to_end(zoom)
+            return level
+
+        self.level_misses += 1
+        level = self.build_level(zoom)
+        self.add_level(zoom, level)
+        return level
+
+    def add_level(self, zoom, level):
+        """
+        Ajoute (ou remplace) un niveau dans le cache puis applique le budget mémoire.
+        """
+        if zoom in self.levels:
+            del self.levels[zoom]
+            self.used_bytes -= self.level_bytes.pop(zoom)
+        nbytes = sum(atlas.get_bytesize() * atlas.get_width() * atlas.get_height() for atlas in level[0])
+        self.levels[zoom] = level
+        self.level_bytes[zoom] = nbytes
+        self.used_bytes += nbytes
+        self.evict(keep=zoom)
+
+    def evict(self, keep):
+        """
+        Évince les niveaux de zoom les moins récemment utilisés tant que le budget est dépassé.
+        Le niveau keep et le niveau affiché ne sont jamais évincés.
+        """
+        for zoom in list(self.levels):
+            if self.used_bytes <= self.budget_bytes:
+                break
+            if zoom in (keep, self.display_zoom):
+                continue
+            del self.levels[zoom]
+            self.used_bytes -= self.level_bytes.pop(zoom)
+
+    def build_level(self, zoom):
+        """
+        Met à l'échelle toutes les tuiles utilisées par la carte pour un niveau de zoom et les range
+        dans deux atlas : les tuiles opaques (voir Map.classify_tiles) dans un atlas sans canal alpha,
+        copiées sans mélange, les autres dans un atlas avec alpha.
+        Retourne ((atlas alpha, atlas opaque), {gid: (atlas source, rectangle)}).
+        """
+        opaque = self.map.classify_tiles()[0]
+        groups = {False: ([], []), True: ([], [])}
+        for gid in sorted(self.map.used_gids):
+            image = self.scale_tile(gid, zoom)
+            if image is not None:
+                gids, images = groups[bool(opaque[gid])]
+                gids.append(gid)
+                images.append(image)
+
+        atlases = []
+        tiles = {}
+        for is_opaque, (gids, images) in groups.items():
+            atlas, rects = pack_atlas(images, 0 if is_opaque else pygame.SRCALPHA)
+            atlases.append(atlas)
+            tiles.update((gid, (atlas, pygame.Rect(rect))) for gid, rect in zip(gids, rects))
+        return tuple(atlases), tiles
+
+    def prepare(self, zoom, bake=None):
+        """
+        Lance la construction d'un niveau de zoom en arrière-plan.
+        bake(zoom, level) est appelé dans le thread une fois l'atlas prêt et peut retourner
+        des chunks pré-rendus avec ces tuiles. Sans mode arrière-plan, le niveau sera construit à la demande.
+        Une erreur dans le thread est notée et publiée par publish() : le niveau est alors reconstruit
+        dans le thread principal au premier rendu (qui relève l'erreur si elle se reproduit).
+        """
+        zoom = quantize_zoom(zoom)
+        if not self.background or zoom in self.levels or zoom in self.pending:
+            return
+
+        def worker():
+            try:
+                level = self.build_level(zoom)
+                chunks = bake(zoom, level) if bake else {}
+            except Exception as e:
+                log.error("Construction du niveau de zoom %s impossible: %s", zoom, e)
+                with self.lock:
+                    self.errors[zoom] = e
+                return
+            with self.lock:
+                self.finished[zoom] = (level, chunks)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        self.pending[zoom] = thread
+        thread.start()
+
+    def publish(self):
+        """
+        Intègre au cache les niveaux terminés par les threads de construction.
+        Les niveaux en erreur ne sont plus attendus : ils seront construits à la demande.
+        Retourne la liste des (zoom, chunks) pré-rendus à transmettre au cache de chunks.
+        """
+        with self.lock:
+            finished = self.finished
+            self.finished = {}
+            errors = self.errors
+            self.errors = {}
+
+        for zoom in errors:
+            self.pending.pop(zoom, None)
+
+        published = []
+        for zoom, (level, chunks) in finished.items():
+            self.pending.pop(zoom, None)
+            self.add_level(zoom, level)
+            published.append((zoom, chunks))
+        return published
+
+    def is_ready(self, zoom):
+        """
+        Indique si le niveau de zoom peut être affiché sans attendre le thread de construction
+        (en cas d'erreur dans le thread, il sera construit dans le thread principal).
+        """
+        zoom = quantize_zoom(zoom)
+        if not self.background or zoom in self.levels:
+            return True
+        with self.lock:
+            return zoom in self.finished or zoom in self.errors
+
+    def resolve_zoom(self, zoom):
+        """
+        Retourne le zoom à utiliser pour l'affichage : le zoom demandé s'il est prêt,
+        sinon le dernier niveau affiché tant que le nouveau est en construction.
+        """
+        zoom = quantize_zoom(zoom)
+        if zoom in self.pending and self.display_zoom is not None:
+            return self.display_zoom
+        self.display_zoom = zoom
+        return zoom
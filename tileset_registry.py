@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import pygame
+import pytmx
+import logger as lg
+
+log = lg.get_logger("tileset_registry")
+
+
+def hash_file(filename):
+    """
+    Retourne l'empreinte SHA-1 (hexadécimale) du contenu d'un fichier.
+    """
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class TilesetRegistry:
+    def __init__(self):
+        """
+        Initialise le registre des jeux de tuiles partagés par toutes les cartes du processus.
+        Un jeu de tuiles est identifié par (chemin du .tsx, empreinte de son contenu) et compte
+        ses références : il est libéré quand plus aucune carte ne l'utilise. Les feuilles décodées
+        et les tuiles découpées n'existent qu'en un exemplaire ; les tuiles mises à l'échelle
+        restent dans l'atlas de chaque carte (voir TileCache).
+        """
+        self.tilesets = {}  # (chemin, empreinte) -> {"refs", "sheets": {image: Surface}, "tiles": {tuile: Surface}}
+        self.lock = threading.RLock()
+
+    def acquire(self, filename):
+        """
+        Prend une référence sur le jeu de tuiles décrit par filename (.tsx, ou image d'un jeu intégré
+        au TMX) et retourne sa clé.
+        """
+        key = (filename, hash_file(filename))
+        with self.lock:
+            tileset = self.tilesets.setdefault(key, {"refs": 0, "sheets": {}, "tiles": {}})
+            tileset["refs"] += 1
+        return key
+
+    def release(self, key):
+        """
+        Rend une référence ; le jeu de tuiles est libéré à la dernière.
+        """
+        with self.lock:
+            tileset = self.tilesets.get(key)
+            if tileset is None:
+                return
+            tileset["refs"] -= 1
+            if tileset["refs"] > 0:
+                return
+            del self.tilesets[key]
+            log.debug("Jeu de tuiles libéré : %s", key[0])
+
+    def load_sheet(self, key, image_file):
+        """
+        Retourne la feuille image_file du jeu de tuiles key, décodée une seule fois (sans conversion
+        au format de l'écran : peut être appelée depuis un thread de chargement).
+        Si key n'est plus référencé (carte déjà libérée), la feuille est décodée sans être gardée.
+        """
+        with self.lock:
+            tileset = self.tilesets.get(key)
+            if tileset is None:
+                log.debug("Jeu de tuiles non référencé, feuille non gardée : %s", image_file)
+                return pygame.image.load(image_file)
+            sheet = tileset["sheets"].get(image_file)
+            if sheet is None:
+                sheet = tileset["sheets"][image_file] = pygame.image.load(image_file)
+                log.debug("Feuille de tuiles décodée : %s", image_file)
+            return sheet
+
+    def get_tile(self, key, tile_id, colorkey, pixelalpha):
+        """
+        Retourne la Surface d'une tuile, tile_id = (image, rectangle ou None, drapeaux de rotation).
+        La feuille est décodée une seule fois ; la tuile est découpée et convertie comme le fait pytmx.
+        Comme pour load_sheet, rien n'est gardé si key n'est plus référencé.
+        """
+        with self.lock:
+            tileset = self.tilesets.get(key)
+            tile = tileset["tiles"].get(tile_id) if tileset is not None else None
+            if tile is not None:
+                return tile
+
+            image_file, rect, flags = tile_id
+            sheet = self.load_sheet(key, image_file)
+            tile = sheet.subsurface(rect) if rect else sheet.copy()
+            if flags:
+                tile = pytmx.util_pygame.handle_transformation(tile, flags)
+            tile = pytmx.util_pygame.smart_convert(tile, colorkey, pixelalpha)
+            if tileset is not None:
+                tileset["tiles"][tile_id] = tile
+            return tile